@@ -1,15 +1,96 @@
+import io
 import numpy as np
-import sounddevice as sd
+import soundfile as sf
 import threading
+from config import SAMPLE_RATE
 
-SAMPLE_RATE = 24000
+# sounddevice is imported where a stream is opened, so encoding and VAD work on machines without PortAudio
 CHANNELS = 1
 CHUNK_LENGTH_S = 0.05
+PLAYBACK_BUFFER_S = 120
+RECORD_LIMIT_S = 10
+PREROLL_S = 0.3
+
+# format -> (file extension, soundfile subtype, mime type)
+UPLOAD_FORMATS = {
+    "WAV": ("wav", "PCM_16", "audio/wav"),
+    "FLAC": ("flac", "PCM_16", "audio/flac"),
+    "OGG": ("ogg", "VORBIS", "audio/ogg"),
+}
+
+VAD_FRAME_S = 0.02
+VAD_MIN_RMS = 300.0
+VAD_MAX_THRESHOLD = 1500.0
+VAD_NOISE_FACTOR = 3.0
+VAD_UNVOICED_ZCR = 0.25
+VAD_PAD_S = 0.2
+VAD_MIN_SPEECH_S = 0.25
+RESAMPLE_TAPS = 63
+RESAMPLE_CUTOFF = 0.9  # fraction of the target Nyquist kept by the anti-aliasing filter
+
+def detect_speech(data, samplerate=SAMPLE_RATE, frame_s=VAD_FRAME_S, min_speech_s=VAD_MIN_SPEECH_S, pad_s=VAD_PAD_S):
+    frame = int(frame_s * samplerate)
+    count = len(data) // frame
+    stats = {"input_s": len(data) / samplerate, "speech_s": 0.0, "trimmed_s": 0.0, "threshold": None}
+    if count == 0:
+        return data[:0], stats
+    frames = data[:count * frame].reshape(count, frame).astype(np.float32)
+    rms = np.sqrt(np.mean(frames * frames, axis=1))
+    signs = np.signbit(frames)
+    zcr = np.count_nonzero(signs[:, 1:] != signs[:, :-1], axis=1) / frame
+    # The quietest frames of the clip approximate the room noise floor
+    noise_floor = np.percentile(rms, 10)
+    threshold = max(VAD_MIN_RMS, min(noise_floor * VAD_NOISE_FACTOR, VAD_MAX_THRESHOLD))
+    # Quieter frames still count when their zero-crossing rate looks like unvoiced consonants
+    speech = (rms > threshold) | ((rms > threshold * 0.5) & (zcr > VAD_UNVOICED_ZCR))
+    speech_frames = np.flatnonzero(speech)
+    stats["threshold"] = float(threshold)
+    stats["speech_s"] = len(speech_frames) * frame_s
+    if stats["speech_s"] < min_speech_s:
+        return data[:0], stats
+    pad = int(pad_s / frame_s)
+    start = max(0, speech_frames[0] - pad) * frame
+    end = min(len(data), (speech_frames[-1] + 1 + pad) * frame)
+    stats["trimmed_s"] = float(len(data) - (end - start)) / samplerate
+    return data[start:end], stats
+
+def lowpass(data, cutoff, taps=RESAMPLE_TAPS):
+    # Hamming-windowed sinc FIR; cutoff is in cycles per sample (0.5 is Nyquist)
+    n = np.arange(taps) - (taps - 1) / 2
+    kernel = 2 * cutoff * np.sinc(2 * cutoff * n) * np.hamming(taps)
+    return np.convolve(data.astype(np.float64), kernel / kernel.sum(), mode="same")
+
+def resample(data, src_rate, dst_rate):
+    if src_rate == dst_rate or len(data) == 0:
+        return data
+    count = int(round(len(data) * dst_rate / src_rate))
+    src_times = np.arange(len(data)) / src_rate
+    dst_times = np.arange(count) / dst_rate
+    samples = data
+    if dst_rate < src_rate:
+        # Linear interpolation alone folds everything above the new Nyquist back into the speech band
+        samples = lowpass(data, RESAMPLE_CUTOFF * dst_rate / (2 * src_rate))
+    return np.clip(np.interp(dst_times, src_times, samples), -32768, 32767).astype(np.int16)
+
+def encode_audio(data, samplerate, fmt="FLAC", target_rate=None):
+    extension, subtype, mimetype = UPLOAD_FORMATS[fmt]
+    if target_rate:
+        data = resample(data, samplerate, target_rate)
+        samplerate = target_rate
+    buffer = io.BytesIO()
+    sf.write(buffer, data, samplerate, format=fmt, subtype=subtype)
+    return f"speech.{extension}", buffer.getvalue(), mimetype
 
 class AudioPlayerAsync:
-    def __init__(self):
-        self.queue = []
-        self.lock = threading.Lock()
+    def __init__(self, capacity_s=PLAYBACK_BUFFER_S):
+        # Fixed-capacity ring buffer. The callback is the only reader and add_data the
+        # only writer path; each side advances its own monotonically increasing index.
+        self.capacity = int(capacity_s * SAMPLE_RATE)
+        self.buffer = np.zeros(self.capacity, dtype=np.int16)
+        self._read_index = 0
+        self._write_index = 0
+        self.write_lock = threading.Lock()
+        import sounddevice as sd
         self.stream = sd.OutputStream(
             callback=self.callback,
             samplerate=SAMPLE_RATE,
@@ -19,20 +100,27 @@ class AudioPlayerAsync:
         )
         self.playing = False
         self._frame_count = 0
+        self.underruns = 0
+        self.overruns = 0
+        self.dropped_samples = 0
+        self._was_playing_audio = False
 
     def callback(self, outdata, frames, time, status):
-        with self.lock:
-            data = np.empty(0, dtype=np.int16)
-            while len(data) < frames and len(self.queue) > 0:
-                item = self.queue.pop(0)
-                frames_needed = frames - len(data)
-                data = np.concatenate((data, item[:frames_needed]))
-                if len(item) > frames_needed:
-                    self.queue.insert(0, item[frames_needed:])
-            self._frame_count += len(data)
-            if len(data) < frames:
-                data = np.concatenate((data, np.zeros(frames - len(data), dtype=np.int16)))
-        outdata[:] = data.reshape(-1, 1)
+        out = outdata[:, 0]
+        read_index = self._read_index
+        available = min(self._write_index - read_index, frames)
+        start = read_index % self.capacity
+        first = min(available, self.capacity - start)
+        out[:first] = self.buffer[start:start + first]
+        if available > first:
+            out[first:available] = self.buffer[:available - first]
+        if available < frames:
+            out[available:] = 0
+            if self._was_playing_audio:
+                self.underruns += 1
+        self._was_playing_audio = available == frames
+        self._read_index = read_index + available
+        self._frame_count += available
 
     def reset_frame_count(self):
         self._frame_count = 0
@@ -40,10 +128,36 @@ class AudioPlayerAsync:
     def get_frame_count(self):
         return self._frame_count
 
-    def add_data(self, data: bytes):
-        with self.lock:
-            np_data = np.frombuffer(data, dtype=np.int16)
-            self.queue.append(np_data)
+    def buffered_samples(self):
+        return self._write_index - self._read_index
+
+    def get_stats(self):
+        return {
+            "capacity_samples": self.capacity,
+            "buffered_samples": self.buffered_samples(),
+            "played_samples": self._frame_count,
+            "underruns": self.underruns,
+            "overruns": self.overruns,
+            "dropped_samples": self.dropped_samples,
+        }
+
+    def add_data(self, data: bytes | np.ndarray):
+        # Raw PCM bytes from the backend or an int16 array (the TTS cache hands out read-only memmaps)
+        np_data = np.frombuffer(data, dtype=np.int16)
+        with self.write_lock:
+            write_index = self._write_index
+            free = self.capacity - (write_index - self._read_index)
+            if len(np_data) > free:
+                self.overruns += 1
+                self.dropped_samples += len(np_data) - free
+                np_data = np_data[:free]
+            count = len(np_data)
+            start = write_index % self.capacity
+            first = min(count, self.capacity - start)
+            self.buffer[start:start + first] = np_data[:first]
+            if count > first:
+                self.buffer[:count - first] = np_data[first:]
+            self._write_index = write_index + count
             if not self.playing:
                 self.start()
 
@@ -54,8 +168,125 @@ class AudioPlayerAsync:
     def stop(self):
         self.playing = False
         self.stream.stop()
-        with self.lock:
-            self.queue = []
+        # The stream is stopped, so the callback can no longer move the read index
+        with self.write_lock:
+            self._read_index = self._write_index
+            self._was_playing_audio = False
 
     def terminate(self):
         self.stream.close()
+
+class NullAudioPlayer:
+    # Drop-in for AudioPlayerAsync on machines without an output device (benchmarks, CI)
+    def __init__(self):
+        self.playing = False
+        self._frame_count = 0
+
+    def reset_frame_count(self):
+        self._frame_count = 0
+
+    def get_frame_count(self):
+        return self._frame_count
+
+    def get_stats(self):
+        return {"played_samples": self._frame_count}
+
+    def add_data(self, data: bytes | np.ndarray):
+        self._frame_count += len(np.frombuffer(data, dtype=np.int16))
+
+    def start(self):
+        self.playing = True
+
+    def stop(self):
+        self.playing = False
+
+    def terminate(self):
+        pass
+
+def default_input_device():
+    try:
+        import sounddevice as sd
+        devices = sd.query_devices()
+    except OSError as e:
+        print(f"[Audio] No audio devices: {e}")
+        return None
+    for i, device in enumerate(devices):
+        if device['max_input_channels'] > 0 and i == sd.default.device[0]:
+            return i
+    return None
+
+class MicCapture:
+    def __init__(self, device=None, max_duration_s=RECORD_LIMIT_S, preroll_s=PREROLL_S):
+        self.device = device
+        # While disarmed the callback keeps the last few hundred ms in a small ring so
+        # the start of a word spoken just before SPACE lands is not lost.
+        self.preroll = np.zeros(int(preroll_s * SAMPLE_RATE), dtype=np.int16)
+        self._preroll_index = 0
+        self.capture = np.zeros(int(max_duration_s * SAMPLE_RATE), dtype=np.int16)
+        self._capture_len = 0
+        self.armed = False
+        self.lock = threading.Lock()
+        self.stream = None
+        self.overflows = 0
+
+    def open(self):
+        if self.stream is not None:
+            return
+        import sounddevice as sd
+        self.stream = sd.InputStream(
+            device=self.device,
+            channels=CHANNELS,
+            samplerate=SAMPLE_RATE,
+            dtype="int16",
+            blocksize=int(CHUNK_LENGTH_S * SAMPLE_RATE),
+            latency="low",
+            callback=self.callback,
+        )
+        self.stream.start()
+
+    def close(self):
+        with self.lock:
+            self.armed = False
+        if self.stream is not None:
+            self.stream.stop()
+            self.stream.close()
+            self.stream = None
+
+    def callback(self, indata, frames, time, status):
+        if status.input_overflow:
+            self.overflows += 1
+        data = indata[:, 0]
+        with self.lock:
+            if self.armed:
+                count = min(frames, len(self.capture) - self._capture_len)
+                self.capture[self._capture_len:self._capture_len + count] = data[:count]
+                self._capture_len += count
+            elif len(self.preroll):
+                size = len(self.preroll)
+                data = data[-size:]
+                start = self._preroll_index % size
+                first = min(len(data), size - start)
+                self.preroll[start:start + first] = data[:first]
+                self.preroll[:len(data) - first] = data[first:]
+                self._preroll_index += len(data)
+
+    def arm(self):
+        with self.lock:
+            size = len(self.preroll)
+            count = min(self._preroll_index, size)
+            if count:
+                start = (self._preroll_index - count) % size
+                first = min(count, size - start)
+                self.capture[:first] = self.preroll[start:start + first]
+                self.capture[first:count] = self.preroll[:count - first]
+            self._capture_len = count
+            self._preroll_index = 0
+            self.armed = True
+
+    def disarm(self):
+        with self.lock:
+            self.armed = False
+            return self.capture[:self._capture_len].copy()
+
+    def is_full(self):
+        return self._capture_len >= len(self.capture)
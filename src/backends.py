@@ -0,0 +1,174 @@
+import os
+import random
+import threading
+import time
+from collections import Counter
+from typing import Iterator, Protocol
+import numpy as np
+from openai_client import request_timeout, warm_up
+from config import SAMPLE_RATE, TTS_STREAM_CHUNK_BYTES
+
+class SpeechBackend(Protocol):
+    cacheable: bool
+    chunk_bytes: int
+
+    def warm_up(self) -> None: ...
+
+    def transcribe(self, upload, model: str) -> str: ...
+
+    def complete(self, messages, model: str, **params) -> str: ...
+
+    def stream_chat(self, messages, model: str, **params) -> Iterator[str]: ...
+
+    def synthesize(self, text: str, voice: str, model: str) -> bytes: ...
+
+    def stream_speech(self, text: str, voice: str, model: str, chunk_size: int) -> Iterator[bytes]: ...
+
+class OpenAIBackend:
+    cacheable = True
+
+    def __init__(self, client, chunk_bytes=TTS_STREAM_CHUNK_BYTES):
+        self.client = client
+        self.chunk_bytes = chunk_bytes
+
+    def warm_up(self):
+        warm_up(self.client)
+
+    def transcribe(self, upload, model):
+        return self.client.audio.transcriptions.create(
+            model=model,
+            file=upload,
+            response_format="text",
+            timeout=request_timeout("stt")
+        )
+
+    def complete(self, messages, model, endpoint="chat", **params):
+        response = self.client.chat.completions.create(
+            model=model,
+            messages=messages,
+            timeout=request_timeout(endpoint),
+            **params
+        )
+        return response.choices[0].message.content
+
+    def stream_chat(self, messages, model, **params):
+        response = self.client.chat.completions.create(
+            model=model,
+            messages=messages,
+            stream=True,
+            timeout=request_timeout("chat"),
+            **params
+        )
+        try:
+            for chunk in response:
+                if chunk.choices and chunk.choices[0].delta.content:
+                    yield chunk.choices[0].delta.content
+        finally:
+            response.close()
+
+    def synthesize(self, text, voice, model):
+        response = self.client.audio.speech.create(
+            model=model,
+            voice=voice,
+            input=text,
+            response_format="pcm",
+            timeout=request_timeout("tts")
+        )
+        return response.read()
+
+    def stream_speech(self, text, voice, model, chunk_size):
+        with self.client.audio.speech.with_streaming_response.create(
+            model=model,
+            voice=voice,
+            input=text,
+            response_format="pcm",
+            timeout=request_timeout("tts")
+        ) as response:
+            yield from response.iter_bytes(chunk_size)
+
+class FakeBackendError(RuntimeError):
+    pass
+
+class FakeBackend:
+    # Deterministic stand-in for offline benchmarks and CI: no network, seeded latency and failures
+    cacheable = False
+
+    def __init__(self, latency=0.3, jitter=0.05, token_delay=0.02, chunk_bytes=TTS_STREAM_CHUNK_BYTES, realtime_factor=4.0,
+                 failure_rate=0.0, seed=0, transcript="Tell me about the company.", seconds_per_char=0.06):
+        self.latency = latency
+        self.jitter = jitter
+        self.token_delay = token_delay
+        self.chunk_bytes = chunk_bytes
+        self.realtime_factor = realtime_factor
+        self.failure_rate = failure_rate
+        self.transcript = transcript
+        self.seconds_per_char = seconds_per_char
+        self.seed = seed
+        self.lock = threading.Lock()
+        self.calls = Counter()
+        self.repeats = Counter()
+
+    @classmethod
+    def from_env(cls, environ=os.environ):
+        # VBAI_FAKE_<PARAM> overrides, e.g. VBAI_FAKE_LATENCY=0.8 VBAI_FAKE_FAILURE_RATE=0.1
+        params = {}
+        for name, kind in (("latency", float), ("jitter", float), ("token_delay", float), ("chunk_bytes", int),
+                           ("realtime_factor", float), ("failure_rate", float), ("seed", int)):
+            value = environ.get(f"VBAI_FAKE_{name.upper()}")
+            if value is not None:
+                params[name] = kind(value)
+        return cls(**params)
+
+    def _begin(self, name, key):
+        # Each call draws from its own generator, seeded by the call and its input rather than by arrival
+        # order, so concurrent workers see the same latencies and failures on every run
+        with self.lock:
+            self.calls[name] += 1
+            self.repeats[(name, key)] += 1
+            occurrence = self.repeats[(name, key)]
+        rng = random.Random(f"{self.seed}:{name}:{key}:{occurrence}")
+        delay = max(0.0, self.latency + rng.uniform(-self.jitter, self.jitter))
+        failed = rng.random() < self.failure_rate
+        time.sleep(delay)
+        if failed:
+            raise FakeBackendError(f"Simulated {name} failure")
+
+    def _reply_for(self, messages):
+        last_user = next((m["content"] for m in reversed(messages) if m["role"] == "user"), "")
+        return (f"Thanks for asking about {last_user[:40].rstrip('.?!')}. "
+                "We have a few ventures in progress right now. Happy to walk you through any of them.")
+
+    def _pcm_for(self, text):
+        samples = max(1, int(len(text) * self.seconds_per_char * SAMPLE_RATE))
+        t = np.arange(samples) / SAMPLE_RATE
+        return (np.sin(2 * np.pi * 220 * t) * 3000).astype(np.int16).tobytes()
+
+    def warm_up(self):
+        pass
+
+    def transcribe(self, upload, model):
+        self._begin("transcribe", len(upload[1]))
+        return self.transcript
+
+    def complete(self, messages, model, **params):
+        self._begin("complete", messages[-1]["content"])
+        return self._reply_for(messages)
+
+    def stream_chat(self, messages, model, **params):
+        self._begin("stream_chat", messages[-1]["content"])
+        for word in self._reply_for(messages).split(" "):
+            time.sleep(self.token_delay)
+            yield word + " "
+
+    def synthesize(self, text, voice, model):
+        self._begin("synthesize", text)
+        return self._pcm_for(text)
+
+    def stream_speech(self, text, voice, model, chunk_size):
+        self._begin("stream_speech", text)
+        audio = self._pcm_for(text)
+        chunk_size = chunk_size or self.chunk_bytes
+        for start in range(0, len(audio), chunk_size):
+            chunk = audio[start:start + chunk_size]
+            time.sleep(len(chunk) / 2 / SAMPLE_RATE / self.realtime_factor)
+            yield chunk
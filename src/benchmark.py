@@ -0,0 +1,163 @@
+import argparse
+import json
+import math
+import sys
+import time
+import numpy as np
+import pygame
+from OpenGL.GL import *
+import crowd
+import dialogue
+import mesh
+import npc
+import render_state
+import world
+from main import init_display, init_gl
+from audio_util import NullAudioPlayer
+from backends import FakeBackend
+from collision import OccupancyGrid
+from crowd import Crowd
+from frustum import Frustum
+from level import load_level
+from config import WINDOW_WIDTH, WINDOW_HEIGHT, FPS
+
+# Modules whose GL entry points are wrapped to count the calls issued from Python
+COUNTED_MODULES = [world, mesh, npc, dialogue, crowd, render_state]
+
+BENCH_MESSAGE = ("Thanks for stopping by. We have three ventures in build right now, and two of them are hiring. "
+                 "Happy to walk you through the roles, the teams and how our studio model works day to day.")
+
+class GLCallCounter:
+    def __init__(self, modules):
+        self.modules = modules
+        self.originals = []
+        self.count = 0
+
+    def wrap(self, fn):
+        def counted(*args, **kwargs):
+            self.count += 1
+            return fn(*args, **kwargs)
+        return counted
+
+    def install(self):
+        for module in self.modules:
+            for name, value in list(vars(module).items()):
+                if name.startswith("gl") and callable(value):
+                    self.originals.append((module, name, value))
+                    setattr(module, name, self.wrap(value))
+
+    def uninstall(self):
+        for module, name, value in self.originals:
+            setattr(module, name, value)
+        self.originals = []
+
+def place_npcs(count):
+    side = max(1, math.ceil(math.sqrt(count)))
+    coords = np.linspace(-4, 4, side) if side > 1 else np.zeros(1)
+    npcs = []
+    for i in range(count):
+        role = "HR" if i % 2 == 0 else "CEO"
+        npcs.append(npc.NPC(float(coords[i % side]), 0, float(coords[i // side]), role))
+    return npcs
+
+def summarize(samples_ms, calls):
+    samples = np.array(samples_ms)
+    return {
+        "p50_ms": round(float(np.percentile(samples, 50)), 4),
+        "p95_ms": round(float(np.percentile(samples, 95)), 4),
+        "p99_ms": round(float(np.percentile(samples, 99)), 4),
+        "mean_ms": round(float(samples.mean()), 4),
+        "gl_calls_per_frame": round(float(np.mean(calls)), 1),
+    }
+
+def run(frames, warmup, npc_count, map_path=None, crowd_count=0):
+    screen = init_display(pygame.HIDDEN)
+    init_gl()
+    scene = world.World(load_level(map_path) if map_path else None)
+    scene.compile()
+    npcs = place_npcs(npc_count)
+    ambient = Crowd.spawn(scene.level, OccupancyGrid.from_level(scene.level), crowd_count) if crowd_count else None
+    ui = dialogue.DialogueSystem(FakeBackend(latency=0, jitter=0), screen, audio_player=NullAudioPlayer())
+    ui.active = True
+    ui.input_active = True
+    ui.npc_message = BENCH_MESSAGE
+    counter = GLCallCounter(COUNTED_MODULES)
+    counter.install()
+    components = ["world", "npcs", "crowd", "dialogue"]
+    timings = {name: [] for name in components}
+    calls = {name: [] for name in components}
+    frame_times = []
+    avoided = []
+
+    def timed(name, frame, draw):
+        counter.count = 0
+        start = time.perf_counter()
+        draw()
+        glFinish()
+        if frame >= warmup:
+            timings[name].append((time.perf_counter() - start) * 1000)
+            calls[name].append(counter.count)
+
+    try:
+        for frame in range(warmup + frames):
+            pygame.event.pump()
+            # Typing changes the input line every few frames, exercising the partial texture upload path
+            if frame % 4 == 0:
+                ui.user_input = "hello " * ((frame // 4) % 10)
+            frame_start = time.perf_counter()
+            avoided_before = render_state.gl_state.avoided
+            glClear(GL_COLOR_BUFFER_BIT | GL_DEPTH_BUFFER_BIT)
+            glPushMatrix()
+            # A slow pan keeps the view changing the way it does in play
+            glRotatef(360.0 * frame / max(1, frames), 0, 1, 0)
+            glTranslatef(0, -0.5, 0)
+            frustum = Frustum.from_gl()
+            timed("world", frame, lambda: scene.draw(frustum))
+            timed("npcs", frame, lambda: [character.draw(frustum, frustum.eye) for character in npcs])
+            if ambient:
+                ambient.update(1.0 / FPS)
+            timed("crowd", frame, lambda: ambient and ambient.draw(frustum))
+            glPopMatrix()
+            timed("dialogue", frame, ui.render)
+            if frame >= warmup:
+                frame_times.append((time.perf_counter() - frame_start) * 1000)
+                avoided.append(render_state.gl_state.avoided - avoided_before)
+            pygame.display.flip()
+    finally:
+        counter.uninstall()
+    report = {
+        "frames": frames,
+        "warmup_frames": warmup,
+        "npc_count": npc_count,
+        "crowd_count": crowd_count,
+        "chunks": len(scene.level.chunks),
+        "window": [WINDOW_WIDTH, WINDOW_HEIGHT],
+        "gl_vendor": glGetString(GL_VENDOR).decode(errors="replace"),
+        "gl_renderer": glGetString(GL_RENDERER).decode(errors="replace"),
+        "components": {name: summarize(timings[name], calls[name]) for name in components},
+        "frame": summarize(frame_times, [sum(c) for c in zip(*calls.values())]),
+        "state_changes_avoided_per_frame": round(float(np.mean(avoided)), 1),
+    }
+    pygame.quit()
+    return report
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Headless rendering benchmark for the world, NPCs and dialogue overlay")
+    parser.add_argument("--frames", type=int, default=300)
+    parser.add_argument("--warmup", type=int, default=30)
+    parser.add_argument("--npcs", type=int, default=2)
+    parser.add_argument("--crowd", type=int, default=0, help="ambient NPCs drawn through the batched crowd renderer")
+    parser.add_argument("--map", help="level file to render instead of the built-in office")
+    parser.add_argument("--output", help="write the JSON report here instead of stdout")
+    args = parser.parse_args(argv)
+    report = run(args.frames, args.warmup, args.npcs, args.map, args.crowd)
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text + "\n")
+        print(f"[Benchmark] Report written to {args.output}")
+    else:
+        print(text)
+
+if __name__ == "__main__":
+    sys.exit(main())
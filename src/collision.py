@@ -0,0 +1,109 @@
+import math
+import numpy as np
+from config import COLLISION_CELL_SIZE, PLAYER_RADIUS
+
+# Furniture footprints as local (center_x, center_z, half_x, half_z) boxes, before the prop's rotation
+PROP_FOOTPRINTS = {
+    'desk': [(0, 0, 0.4, 0.3)],
+    'chair': [(0, 0, 0.15, 0.15)],
+    'partition': [(0, 0, 0.025, 0.5), (0, 0.5, 0.4, 0.025)],
+    'plant': [(0, 0, 0.1, 0.1)],
+}
+
+def rotated_bounds(x, z, rotation, box):
+    cx, cz, hx, hz = box
+    # Same rotation glRotatef(rotation, 0, 1, 0) applies to the prop's geometry
+    angle = math.radians(rotation)
+    cos_a, sin_a = math.cos(angle), math.sin(angle)
+    center_x = x + cx * cos_a + cz * sin_a
+    center_z = z - cx * sin_a + cz * cos_a
+    half_x = abs(hx * cos_a) + abs(hz * sin_a)
+    half_z = abs(hx * sin_a) + abs(hz * cos_a)
+    return center_x - half_x, center_z - half_z, center_x + half_x, center_z + half_z
+
+class OccupancyGrid:
+    # Obstacles are grown by the player radius when stamped, so the player is tested as a single point
+    def __init__(self, width, depth, origin, cell_size=COLLISION_CELL_SIZE, radius=PLAYER_RADIUS):
+        self.cell_size = cell_size
+        self.radius = radius
+        self.origin = origin
+        self.cols = max(1, math.ceil(width / cell_size))
+        self.rows = max(1, math.ceil(depth / cell_size))
+        self.static = np.zeros((self.rows, self.cols), dtype=bool)
+        # Counts rather than flags so overlapping NPC stamps can be removed independently
+        self.dynamic = np.zeros((self.rows, self.cols), dtype=np.int16)
+        self.stamps = {}
+
+    @classmethod
+    def from_level(cls, level, cell_size=COLLISION_CELL_SIZE, radius=PLAYER_RADIUS):
+        grid = cls(level.width, level.depth, level.origin, cell_size, radius)
+        size = level.tile_size
+        for row in range(level.rows):
+            for col in range(level.cols):
+                if not level.is_floor(col, row):
+                    x0, z0 = level.tile_origin(col, row)
+                    grid.block_rect(x0, z0, x0 + size, z0 + size)
+        for kind, x, z, *rest in level.props:
+            rotation = rest[0] if rest else 0
+            for box in PROP_FOOTPRINTS.get(kind, []):
+                grid.block_rect(*rotated_bounds(x, z, rotation, box))
+        blocked = int(grid.static.sum())
+        print(f"[Collision] Built {grid.cols}x{grid.rows} occupancy grid ({blocked} blocked cells)")
+        return grid
+
+    def cell_range(self, x0, z0, x1, z1):
+        c0 = max(0, int(math.floor((x0 - self.radius - self.origin[0]) / self.cell_size)))
+        r0 = max(0, int(math.floor((z0 - self.radius - self.origin[1]) / self.cell_size)))
+        c1 = min(self.cols, int(math.ceil((x1 + self.radius - self.origin[0]) / self.cell_size)))
+        r1 = min(self.rows, int(math.ceil((z1 + self.radius - self.origin[1]) / self.cell_size)))
+        return slice(r0, max(r0, r1)), slice(c0, max(c0, c1))
+
+    def block_rect(self, x0, z0, x1, z1):
+        self.static[self.cell_range(x0, z0, x1, z1)] = True
+
+    def add_obstacle(self, key, x, z, radius):
+        self.remove_obstacle(key)
+        cells = self.cell_range(x - radius, z - radius, x + radius, z + radius)
+        self.dynamic[cells] += 1
+        self.stamps[key] = cells
+
+    def remove_obstacle(self, key):
+        cells = self.stamps.pop(key, None)
+        if cells is not None:
+            self.dynamic[cells] -= 1
+
+    def is_blocked(self, x, z):
+        col = int((x - self.origin[0]) // self.cell_size)
+        row = int((z - self.origin[1]) // self.cell_size)
+        if not (0 <= col < self.cols and 0 <= row < self.rows):
+            return True
+        return bool(self.static[row, col]) or self.dynamic[row, col] > 0
+
+    def sweep(self, x, z, dx, dz):
+        # Half-cell substeps cannot skip over a blocked cell; each axis resolves separately so the player slides
+        steps = max(1, math.ceil(max(abs(dx), abs(dz)) / (self.cell_size * 0.5)))
+        step_x = dx / steps
+        step_z = dz / steps
+        for _ in range(steps):
+            if step_x:
+                if self.is_blocked(x + step_x, z):
+                    step_x = 0
+                else:
+                    x += step_x
+            if step_z:
+                if self.is_blocked(x, z + step_z):
+                    step_z = 0
+                else:
+                    z += step_z
+            if not step_x and not step_z:
+                break
+        return x, z
+
+    def blocked_many(self, xs, zs):
+        cols = np.floor((xs - self.origin[0]) / self.cell_size).astype(np.int64)
+        rows = np.floor((zs - self.origin[1]) / self.cell_size).astype(np.int64)
+        inside = (cols >= 0) & (cols < self.cols) & (rows >= 0) & (rows < self.rows)
+        blocked = np.ones(len(xs), dtype=bool)
+        cols, rows = cols[inside], rows[inside]
+        blocked[inside] = self.static[rows, cols] | (self.dynamic[rows, cols] > 0)
+        return blocked
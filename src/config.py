@@ -2,7 +2,13 @@
 WINDOW_WIDTH = 800
 WINDOW_HEIGHT = 600
 TILE_SIZE = 32
+WORLD_TILE_SIZE = 0.5  # world units per GAME_MAP tile
 FPS = 60
+FIELD_OF_VIEW = 45
+LOD_BIAS = 1.0  # >1 keeps full detail further away, <1 drops it sooner
+VSYNC = 0  # 0 off, 1 on, -1 adaptive (falls back to on, then off, if the driver refuses)
+SIM_HZ = 120  # fixed simulation rate, independent of the render rate
+MAX_FRAME_TIME = 0.25  # clamp after stalls so the simulation does not spiral
 
 # Colors
 BLACK = (0, 0, 0)
@@ -13,25 +19,76 @@ BROWN = (139, 69, 19)
 RED = (255, 0, 0)
 GRAY = (128, 128, 128)
 
-# Game map
+# Game map (one tile is WORLD_TILE_SIZE units; the walled 20x20 interior is the 10x10 office)
 GAME_MAP = [
-    "WWWWWWWWWWWWWWWWWWWW",
-    "W..................W",
-    "W..................W",
-    "W........N.........W",
-    "W..................W",
-    "W..................W",
-    "W..................W",
-    "W....P.............W",
-    "W..................W",
-    "W..................W",
-    "W..................W",
-    "W..................W",
-    "WWWWWWWWWWWWWWWWWWWW"
+    "WWWWWWWWWWWWWWWWWWWWWW",
+    "W....................W",
+    "W....................W",
+    "W....................W",
+    "W....................W",
+    "W....................W",
+    "W....................W",
+    "W....................W",
+    "W....................W",
+    "W....................W",
+    "W....................W",
+    "W....................W",
+    "W....................W",
+    "W....................W",
+    "W....................W",
+    "W....................W",
+    "W....................W",
+    "W....................W",
+    "W....................W",
+    "W....................W",
+    "W....................W",
+    "WWWWWWWWWWWWWWWWWWWWWW"
 ]
 
+# Furniture as (kind, x, z[, rotation]) in world units
+OFFICE_PROPS = [
+    ("desk", -4, -2, 90),
+    ("desk", 4, 1, -90),
+    ("chair", -3.5, -2, 90),
+    ("chair", 3.5, 1, -90),
+    ("partition", -4, -2),
+    ("partition", 4, 1),
+    ("plant", -4.5, -4.5),
+    ("plant", 4.5, -4.5),
+    ("plant", -4.5, 4.5),
+    ("plant", 4.5, 4.5),
+]
+LEVEL_CHUNK_TILES = 8
+LEVEL_MAP_PATH = None  # map file to load instead of GAME_MAP/OFFICE_PROPS
+COLLISION_CELL_SIZE = 0.1
+PLAYER_RADIUS = 0.3
+NPC_COLLISION_RADIUS = 0.25
+
+# Ambient crowd
+AMBIENT_NPC_COUNT = 0
+CROWD_SPHERE_DETAIL = 8
+CROWD_SPEED = 0.6  # units per second
+CROWD_WANDER_RADIUS = 2.0
+
 TITLE = "Venture Builder AI"
 SUBTITLE = "Our Digital Employees"
 MENU_BG_COLOR = (0, 0, 0)
 MENU_TEXT_COLOR = (0, 255, 0)
-MENU_HIGHLIGHT_COLOR = (0, 200, 0)
\ No newline at end of file
+MENU_HIGHLIGHT_COLOR = (0, 200, 0)
+
+# Dialogue
+SAMPLE_RATE = 24000  # capture and playback rate; the TTS API returns 24 kHz PCM
+TTS_STREAMING = True
+TTS_STREAM_CHUNK_BYTES = 4800  # 100 ms of 24 kHz mono int16 PCM
+CHAT_STREAMING = True
+MIN_TTS_SENTENCE_CHARS = 20
+DIALOGUE_WORKERS = 2
+STT_UPLOAD_FORMAT = "FLAC"  # WAV, FLAC or OGG
+STT_SAMPLE_RATE = 16000  # None uploads at the capture rate
+VAD_ENABLED = True
+TTS_CACHE_ENABLED = True
+TTS_CACHE_PREWARM = True
+
+# Profiler
+PROFILER_FRAMES = 600
+PROFILER_OVERLAY_REFRESH_S = 0.25
@@ -0,0 +1,205 @@
+import numpy as np
+from OpenGL.GL import *
+from mesh import build_sphere, build_cube
+from render_state import gl_state
+from npc import NPC_BOUNDS_OFFSET_Y, NPC_BOUNDS_RADIUS
+from config import CROWD_SPHERE_DETAIL, CROWD_SPEED, CROWD_WANDER_RADIUS
+
+SKIN, HAIR, PRIMARY, SECONDARY = range(4)
+NPC_SCALE = 0.6
+NPC_HEIGHT = 0.65
+
+# Body parts as (shape, offset, scale, colour slot) in the NPC's unscaled model space, same layout as NPC.draw
+BODY_TYPES = {
+    'standard': [
+        ('sphere', (0, 0, 0), 0.12, SKIN),
+        ('sphere', (0, 0.05, 0), 0.13, HAIR),
+        ('cube', (0, -0.3, 0), (0.3, 0.4, 0.2), PRIMARY),
+        ('cube', (-0.2, -0.3, 0), (0.1, 0.4, 0.1), SECONDARY),
+        ('cube', (0.2, -0.3, 0), (0.1, 0.4, 0.1), SECONDARY),
+        ('cube', (-0.1, -0.8, 0), (0.1, 0.5, 0.1), SECONDARY),
+        ('cube', (0.1, -0.8, 0), (0.1, 0.5, 0.1), SECONDARY),
+    ],
+    'slim': [
+        ('sphere', (0, 0, 0), 0.11, SKIN),
+        ('sphere', (0, 0.05, 0), 0.12, HAIR),
+        ('cube', (0, -0.3, 0), (0.24, 0.42, 0.16), PRIMARY),
+        ('cube', (-0.16, -0.3, 0), (0.08, 0.42, 0.08), SECONDARY),
+        ('cube', (0.16, -0.3, 0), (0.08, 0.42, 0.08), SECONDARY),
+        ('cube', (-0.08, -0.8, 0), (0.08, 0.5, 0.08), SECONDARY),
+        ('cube', (0.08, -0.8, 0), (0.08, 0.5, 0.08), SECONDARY),
+    ],
+}
+
+# (skin, hair, primary, secondary) per palette; the first two match the HR and CEO NPCs
+CROWD_PALETTES = np.array([
+    [(0.8, 0.7, 0.6), (0.2, 0.15, 0.1), (0.8, 0.2, 0.2), (0.6, 0.15, 0.15)],
+    [(0.8, 0.7, 0.6), (0.3, 0.3, 0.3), (0.2, 0.3, 0.8), (0.15, 0.2, 0.6)],
+    [(0.55, 0.4, 0.3), (0.1, 0.08, 0.05), (0.2, 0.6, 0.3), (0.15, 0.4, 0.2)],
+    [(0.9, 0.78, 0.68), (0.6, 0.45, 0.2), (0.85, 0.85, 0.85), (0.3, 0.3, 0.35)],
+    [(0.65, 0.5, 0.38), (0.15, 0.12, 0.1), (0.5, 0.3, 0.6), (0.35, 0.2, 0.45)],
+])
+
+def build_body(parts, detail):
+    vertices, normals, slots, indices = [], [], [], []
+    base = 0
+    for shape, offset, scale, slot in parts:
+        if shape == 'sphere':
+            mesh = build_sphere(scale, detail, detail)
+            part_indices = mesh.indices
+            part_vertices = mesh.data[:, :3]
+        else:
+            mesh = build_cube()
+            # Quads split into triangles so the whole body goes out in one GL_TRIANGLES call
+            quads = np.arange(len(mesh.data)).reshape(-1, 4)
+            part_indices = quads[:, [0, 1, 2, 0, 2, 3]].ravel()
+            part_vertices = mesh.data[:, :3] * np.asarray(scale, dtype=np.float32)
+        vertices.append(part_vertices + np.asarray(offset, dtype=np.float32))
+        normals.append(mesh.data[:, 3:])
+        slots.append(np.full(len(mesh.data), slot))
+        indices.append(part_indices + base)
+        base += len(mesh.data)
+    return (np.concatenate(vertices).astype(np.float32) * NPC_SCALE, np.concatenate(normals).astype(np.float32),
+            np.concatenate(slots), np.concatenate(indices).astype(np.uint32))
+
+class BodyBatch:
+    # Every instance of one body type in a single draw: static normals and indices, streamed positions and colours
+    def __init__(self, parts, capacity, detail=CROWD_SPHERE_DETAIL):
+        self.vertices, self.normals, self.slots, self.template_indices = build_body(parts, detail)
+        self.capacity = capacity
+        self.vertex_count = len(self.vertices)
+        self.index_count = len(self.template_indices)
+        self.buffers = None
+
+    def upload(self):
+        self.buffers = glGenBuffers(4)
+        position_buffer, normal_buffer, color_buffer, index_buffer = self.buffers
+        normals = np.tile(self.normals, (self.capacity, 1))
+        offsets = np.repeat(np.arange(self.capacity, dtype=np.uint32) * self.vertex_count, self.index_count)
+        indices = np.tile(self.template_indices, self.capacity) + offsets
+        glBindBuffer(GL_ARRAY_BUFFER, normal_buffer)
+        glBufferData(GL_ARRAY_BUFFER, normals.nbytes, normals, GL_STATIC_DRAW)
+        glBindBuffer(GL_ARRAY_BUFFER, position_buffer)
+        glBufferData(GL_ARRAY_BUFFER, self.capacity * self.vertex_count * 12, None, GL_STREAM_DRAW)
+        glBindBuffer(GL_ARRAY_BUFFER, color_buffer)
+        glBufferData(GL_ARRAY_BUFFER, self.capacity * self.vertex_count * 3, None, GL_STREAM_DRAW)
+        glBindBuffer(GL_ARRAY_BUFFER, 0)
+        glBindBuffer(GL_ELEMENT_ARRAY_BUFFER, index_buffer)
+        glBufferData(GL_ELEMENT_ARRAY_BUFFER, indices.nbytes, indices, GL_STATIC_DRAW)
+        glBindBuffer(GL_ELEMENT_ARRAY_BUFFER, 0)
+
+    def draw(self, positions, colors):
+        count = len(positions)
+        if not count:
+            return
+        if self.buffers is None:
+            self.upload()
+        position_buffer, normal_buffer, color_buffer, index_buffer = self.buffers
+        # (count, vertices, 3): template offset by each instance position in one broadcast
+        world_vertices = np.ascontiguousarray(self.vertices[None, :, :] + positions[:, None, :], dtype=np.float32)
+        vertex_colors = np.ascontiguousarray(colors[:, self.slots], dtype=np.uint8)
+        glEnableClientState(GL_VERTEX_ARRAY)
+        glEnableClientState(GL_NORMAL_ARRAY)
+        glEnableClientState(GL_COLOR_ARRAY)
+        glBindBuffer(GL_ARRAY_BUFFER, position_buffer)
+        glBufferSubData(GL_ARRAY_BUFFER, 0, world_vertices.nbytes, world_vertices)
+        glVertexPointer(3, GL_FLOAT, 0, None)
+        glBindBuffer(GL_ARRAY_BUFFER, normal_buffer)
+        glNormalPointer(GL_FLOAT, 0, None)
+        glBindBuffer(GL_ARRAY_BUFFER, color_buffer)
+        glBufferSubData(GL_ARRAY_BUFFER, 0, vertex_colors.nbytes, vertex_colors)
+        glColorPointer(3, GL_UNSIGNED_BYTE, 0, None)
+        glBindBuffer(GL_ELEMENT_ARRAY_BUFFER, index_buffer)
+        glDrawElements(GL_TRIANGLES, count * self.index_count, GL_UNSIGNED_INT, None)
+        glBindBuffer(GL_ELEMENT_ARRAY_BUFFER, 0)
+        glBindBuffer(GL_ARRAY_BUFFER, 0)
+        glDisableClientState(GL_COLOR_ARRAY)
+        glDisableClientState(GL_NORMAL_ARRAY)
+        glDisableClientState(GL_VERTEX_ARRAY)
+        gl_state.invalidate_color()
+
+    def release(self):
+        if self.buffers is not None:
+            glDeleteBuffers(len(self.buffers), self.buffers)
+            self.buffers = None
+
+class Crowd:
+    # Ambient characters as parallel arrays: index i across every array is one NPC
+    def __init__(self, positions, body, palette, collision=None, seed=0):
+        self.rng = np.random.default_rng(seed)
+        count = len(positions)
+        self.positions = np.asarray(positions, dtype=np.float32).reshape(count, 3)
+        self.homes = self.positions[:, [0, 2]].copy()
+        self.targets = self.homes.copy()
+        self.speeds = self.rng.uniform(0.7, 1.3, count).astype(np.float32) * CROWD_SPEED
+        self.body = np.asarray(body, dtype=np.int32)
+        self.palette = np.asarray(palette, dtype=np.int32)
+        self.colors = (CROWD_PALETTES[self.palette] * 255).astype(np.uint8)
+        self.collision = collision
+        self.body_names = list(BODY_TYPES)
+        self.batches = {}
+        for index, name in enumerate(self.body_names):
+            members = int(np.count_nonzero(self.body == index))
+            if members:
+                self.batches[index] = BodyBatch(BODY_TYPES[name], members)
+        self.visible = count
+
+    @classmethod
+    def spawn(cls, level, collision, count, seed=0):
+        rng = np.random.default_rng(seed)
+        x0, z0 = level.origin
+        spots = np.empty((0, 2), dtype=np.float32)
+        # Rejection-sample free floor space in batches
+        for _ in range(100):
+            if len(spots) >= count:
+                break
+            candidates = rng.uniform((x0, z0), (x0 + level.width, z0 + level.depth), (count * 2, 2))
+            free = ~collision.blocked_many(candidates[:, 0], candidates[:, 1])
+            spots = np.concatenate((spots, candidates[free]))
+        spots = spots[:count]
+        positions = np.column_stack((spots[:, 0], np.full(len(spots), NPC_HEIGHT), spots[:, 1]))
+        body = rng.integers(0, len(BODY_TYPES), len(spots))
+        palette = rng.integers(0, len(CROWD_PALETTES), len(spots))
+        print(f"[Crowd] Spawned {len(spots)} ambient NPCs")
+        return cls(positions, body, palette, collision, seed)
+
+    def __len__(self):
+        return len(self.positions)
+
+    def retarget(self, mask):
+        count = int(np.count_nonzero(mask))
+        if count:
+            self.targets[mask] = self.homes[mask] + self.rng.uniform(-CROWD_WANDER_RADIUS, CROWD_WANDER_RADIUS, (count, 2))
+
+    def update(self, dt):
+        if not len(self):
+            return
+        current = self.positions[:, [0, 2]]
+        delta = self.targets - current
+        distance = np.sqrt(np.einsum('ij,ij->i', delta, delta))
+        arrived = distance < 0.05
+        step = np.minimum(self.speeds * dt, distance) / np.maximum(distance, 1e-6)
+        moved = current + delta * step[:, None]
+        blocked = np.zeros(len(self), dtype=bool)
+        if self.collision is not None:
+            blocked = self.collision.blocked_many(moved[:, 0], moved[:, 1])
+        free = ~blocked
+        self.positions[free, 0] = moved[free, 0]
+        self.positions[free, 2] = moved[free, 1]
+        self.retarget(arrived | blocked)
+
+    def draw(self, frustum=None):
+        if not len(self):
+            return
+        mask = np.ones(len(self), dtype=bool)
+        if frustum is not None:
+            centers = self.positions + np.array([0, NPC_BOUNDS_OFFSET_Y, 0], dtype=np.float32)
+            mask = frustum.spheres_visible(centers, np.full(len(self), NPC_BOUNDS_RADIUS))
+        self.visible = int(np.count_nonzero(mask))
+        for index, batch in self.batches.items():
+            members = mask & (self.body == index)
+            batch.draw(self.positions[members], self.colors[members])
+
+    def release(self):
+        for batch in self.batches.values():
+            batch.release()
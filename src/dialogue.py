@@ -2,19 +2,53 @@ import pygame
 import numpy as np
 import asyncio
 import threading
-import os
-import tempfile
-import soundfile as sf
-import sounddevice as sd
-from audio_util import AudioPlayerAsync, SAMPLE_RATE, CHANNELS
-from config import WINDOW_WIDTH, WINDOW_HEIGHT
+import queue
+import re
+from audio_util import AudioPlayerAsync, MicCapture, default_input_device, encode_audio, detect_speech
+from tts_cache import TTSCache
+from render_state import gl_state
+from history import ConversationHistory
+from config import (WINDOW_WIDTH, WINDOW_HEIGHT, SAMPLE_RATE, TTS_STREAMING,
+                    CHAT_STREAMING, MIN_TTS_SENTENCE_CHARS, DIALOGUE_WORKERS,
+                    STT_UPLOAD_FORMAT, STT_SAMPLE_RATE, VAD_ENABLED, TTS_CACHE_ENABLED, TTS_CACHE_PREWARM)
 from OpenGL.GL import *
 from pygame.locals import *
 import time
+from concurrent.futures import ThreadPoolExecutor
+from collections import OrderedDict, deque
+
+TEXT_LAYOUT_CACHE_SIZE = 32
+WORD_WIDTH_CACHE_SIZE = 4096
+CHAT_MODEL = "gpt-4o-2024-08-06"
+CHAT_PARAMS = {
+    "temperature": 0.85,
+    "max_tokens": 150,
+    "response_format": {"type": "text"},
+    "top_p": 0.95,
+    "frequency_penalty": 0.2,
+    "presence_penalty": 0.1,
+}
+STT_MODEL = "whisper-1"
+SUMMARY_MODEL = "gpt-4o-mini"
+TTS_MODEL = "tts-1"
+NPC_VOICES = {"HR": "alloy", "CEO": "echo"}
+GREETINGS = {
+    "HR": "Hello there, I am Sarah Chen, HR Director at Venture Builder AI. How can I assist you today?",
+    "CEO": "Hello there, I am Michael Chen, CEO at Venture Builder AI. What can I do for you today?"
+}
+NO_AUDIO_MESSAGE = "No audio detected. Please hold SPACE to record and release to send."
+NOT_UNDERSTOOD_MESSAGE = "I didn't catch that. Could you repeat?"
+CONNECTION_ERROR_MESSAGE = "I apologize, but I'm having trouble connecting right now."
+FALLBACK_MESSAGES = [NO_AUDIO_MESSAGE, NOT_UNDERSTOOD_MESSAGE, CONNECTION_ERROR_MESSAGE]
+SENTENCE_BREAK = re.compile(r'(?<=[.!?])\s+')
+
+def split_sentences(text):
+    parts = SENTENCE_BREAK.split(text)
+    return parts[:-1], parts[-1]
 
 class DialogueSystem:
-    def __init__(self, client, screen):
-        self.client = client
+    def __init__(self, backend, screen, audio_player=None):
+        self.backend = backend
         self.screen = screen
         self.active = False
         self.user_input = ""
@@ -22,131 +56,293 @@ class DialogueSystem:
         self.font = pygame.font.Font(None, 24)
         self.npc_message = ""
         self.input_active = False
-        self.conversation_history = []
+        self.conversation_history = ConversationHistory()
         self.ui_surface = pygame.Surface((WINDOW_WIDTH, WINDOW_HEIGHT), pygame.SRCALPHA).convert_alpha()
         self.ui_texture = glGenTextures(1)
+        gl_state.bind_texture(GL_TEXTURE_2D, self.ui_texture)
+        # Filtering is per-texture state, so it only needs setting once
+        glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_MIN_FILTER, GL_LINEAR)
+        glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_MAG_FILTER, GL_LINEAR)
+        glTexImage2D(GL_TEXTURE_2D, 0, GL_RGBA, WINDOW_WIDTH, WINDOW_HEIGHT, 0, GL_RGBA, GL_UNSIGNED_BYTE, None)
+        gl_state.bind_texture(GL_TEXTURE_2D, 0)
+        self.box_height = 200
+        self.box_y = WINDOW_HEIGHT - self.box_height - 20
+        # NPC text may run past the bottom of the box, so its region extends to the window edge
+        self.message_rect = pygame.Rect(0, self.box_y + 40, WINDOW_WIDTH, WINDOW_HEIGHT - self.box_y - 40)
+        self.input_rect = pygame.Rect(0, self.box_y + self.box_height - 40, WINDOW_WIDTH, self.font.get_linesize())
+        self.ui_dirty_rects = [self.ui_surface.get_rect()]
+        self.rendered_message = None
+        self.rendered_prompt = None
+        self.text_layout_cache = OrderedDict()
+        self.word_width_cache = {}
         self.current_npc = None
         self.initial_player_pos = None
         self.speech_mode = False
-        self.audio_player = AudioPlayerAsync()
+        self.audio_player = audio_player if audio_player is not None else AudioPlayerAsync()
+        self.tts_streaming = TTS_STREAMING
+        self.tts_metrics = {}
+        self.tts_first_audio_times = deque(maxlen=50)
+        self.tts_cache = None
+        # Synthetic audio from a stand-in backend must never land in the shared cache
+        if TTS_CACHE_ENABLED and getattr(backend, "cacheable", True):
+            try:
+                self.tts_cache = TTSCache()
+            except OSError as e:
+                print(f"[DialogueSystem] TTS cache disabled: {e}")
+        self.chat_streaming = CHAT_STREAMING
+        # Sentences are synthesized one at a time on a single worker so playback stays in order
+        self.tts_queue = queue.Queue()
+        self.tts_generation = 0
+        # Held while checking the generation and queueing audio, so a cancel cannot land in between
+        self.tts_lock = threading.Lock()
+        self.tts_thread = threading.Thread(target=self.run_tts_worker, daemon=True)
+        self.tts_thread.start()
         self.loop = asyncio.new_event_loop()
         self.loop_thread = threading.Thread(target=self.run_asyncio_loop, daemon=True)
         self.loop_thread.start()
-        self.audio_buffer = []
+        # Network calls run on a bounded pool driven from self.loop; results come back through the inbox
+        self.executor = ThreadPoolExecutor(max_workers=DIALOGUE_WORKERS, thread_name_prefix="dialogue")
+        self.turn_lock = asyncio.Lock()
+        self.inbox = queue.Queue()
+        self.pending_jobs = 0
+        self.thinking = False
         self.recording = False
         self.is_recording_key_held = False
-        devices = sd.query_devices()
-
-        # Identify default input device
-        self.default_input_device = None
-        for i, device in enumerate(devices):
-            if device['max_input_channels'] > 0:
-                if i == sd.default.device[0]:  # Check if it's the default input device
-                    self.default_input_device = i
-                    break
+        self.default_input_device = default_input_device()
         print(f"[DialogueSystem] Selected default input device: {self.default_input_device}")
+        # Use the default input device, fallback to device 0 if not set
+        device = self.default_input_device if self.default_input_device is not None else 0
+        self.mic = MicCapture(device=device)
+        if self.tts_cache and TTS_CACHE_PREWARM:
+            self.submit_job(self.prewarm_tts_cache, ordered=False)
+        self.stt_format = STT_UPLOAD_FORMAT
+        self.stt_sample_rate = STT_SAMPLE_RATE
+        self.vad_enabled = VAD_ENABLED
+        self.vad_stats = {}
 
     def run_asyncio_loop(self):
         asyncio.set_event_loop(self.loop)
         print("[DialogueSystem] Asyncio loop started")
         self.loop.run_forever()
 
-    async def record_mic_audio(self):
-        print("[DialogueSystem] Starting audio recording...")
-        read_size = int(SAMPLE_RATE * 0.2)
-        stream = None
+    def submit_job(self, fn, *args, ordered=True):
+        if ordered:
+            self.pending_jobs += 1
+            self.thinking = True
+        return asyncio.run_coroutine_threadsafe(self.run_job(fn, args, ordered), self.loop)
+
+    async def run_job(self, fn, args, ordered):
         try:
-            # Use the default input device, fallback to device 0 if not set
-            device = self.default_input_device if self.default_input_device is not None else 0
-            print(f"[DialogueSystem] Using input device: {device}")
-            stream = sd.InputStream(
-                device=device,
-                channels=CHANNELS,
-                samplerate=SAMPLE_RATE,
-                dtype="int16",
-                blocksize=read_size,
-                latency="low"
-            )
-            await asyncio.sleep(0.5)
-            stream.start()
-            print("[DialogueSystem] Audio input stream started")
-            self.audio_buffer = []
-            self.recording = True
-            start_time = time.time()
-            while self.active and self.speech_mode and self.recording and self.is_recording_key_held:
-                if time.time() - start_time > 10:
-                    print("[DialogueSystem] Recording timeout reached")
+            if ordered:
+                # Conversation turns are serialized so replies never race each other
+                async with self.turn_lock:
+                    await self.loop.run_in_executor(self.executor, fn, *args)
+            else:
+                await self.loop.run_in_executor(self.executor, fn, *args)
+        except Exception as e:
+            print(f"[DialogueSystem] Job error: {e}")
+        finally:
+            if ordered:
+                self.inbox.put(("job_done", None))
+
+    def post_message(self, text, epoch=None):
+        self.inbox.put(("npc_message", (epoch, text)))
+
+    def reply(self, text, epoch=None, generation=None):
+        self.post_message(text, epoch)
+        self.speak(text, generation)
+
+    def update(self):
+        while True:
+            try:
+                kind, payload = self.inbox.get_nowait()
+            except queue.Empty:
+                break
+            if kind == "npc_message":
+                epoch, text = payload
+                # Results of a conversation that has since ended must not overwrite the new one
+                if epoch is None or epoch == self.conversation_history.epoch:
+                    self.npc_message = text
+            elif kind == "job_done":
+                self.pending_jobs -= 1
+                self.thinking = self.pending_jobs > 0
+        # The capture buffer stops growing at its limit, so send what we have rather than keep showing "Recording..."
+        if self.recording and self.mic.is_full():
+            self.finish_recording()
+
+    def run_tts_worker(self):
+        while True:
+            generation, text = self.tts_queue.get()
+            if generation == self.tts_generation:
+                self.generate_tts(text, generation)
+
+    def speak(self, text, generation=None):
+        self.tts_queue.put((self.tts_generation if generation is None else generation, text))
+
+    def cancel_speech(self):
+        with self.tts_lock:
+            self.tts_generation += 1
+            while True:
+                try:
+                    self.tts_queue.get_nowait()
+                except queue.Empty:
                     break
-                if stream.read_available >= read_size:
-                    data, overflowed = stream.read(read_size)
-                    if overflowed:
-                        print("[DialogueSystem] Audio buffer overflow detected")
-                    if data.size > 0:
-                        self.audio_buffer.append(data)
-                        print(f"[DialogueSystem] Recorded audio chunk: {len(data)} samples, max amplitude: {np.max(np.abs(data))}")
-                    else:
-                        print("[DialogueSystem] No audio data captured in chunk")
-                await asyncio.sleep(0.01)
+            self.audio_player.stop()
+            self.audio_player.reset_frame_count()
+
+    def play_audio(self, data, generation=None):
+        with self.tts_lock:
+            if generation is not None and generation != self.tts_generation:
+                return False
+            self.audio_player.add_data(data)
+            return True
+
+    def open_mic(self):
+        try:
+            self.mic.open()
+            print(f"[DialogueSystem] Audio input stream open on device {self.mic.device}")
         except Exception as e:
             print(f"[DialogueSystem] Audio input error: {e}")
-            self.npc_message = f"Audio input error: {str(e)}. Please check your microphone."
-            self.generate_tts(self.npc_message)
-        finally:
-            if stream is not None:
-                stream.stop()
-                stream.close()
-            self.recording = False
-            print("[DialogueSystem] Audio input stream stopped")
-
-    async def process_audio_input(self):
-        if not self.audio_buffer:
+            self.reply(f"Audio input error: {str(e)}. Please check your microphone.")
+
+    def close_mic(self):
+        self.mic.close()
+        if self.mic.overflows:
+            print(f"[DialogueSystem] Audio input overflows this session: {self.mic.overflows}")
+        print("[DialogueSystem] Audio input stream stopped")
+
+    def start_recording(self):
+        self.is_recording_key_held = True
+        self.recording = True
+        self.mic.arm()
+
+    def stop_recording(self):
+        self.is_recording_key_held = False
+        self.recording = False
+        if self.mic.is_full():
+            print("[DialogueSystem] Recording timeout reached")
+        return self.mic.disarm()
+
+    def finish_recording(self):
+        audio_data = self.stop_recording()
+        self.submit_job(self.process_audio_input, audio_data, self.conversation_history.epoch)
+
+    def process_audio_input(self, audio_data, epoch=None):
+        if audio_data is None or len(audio_data) == 0:
             print("[DialogueSystem] No audio data to process")
-            self.npc_message = "No audio detected. Please hold SPACE to record and release to send."
-            self.generate_tts(self.npc_message)
+            self.reply(NO_AUDIO_MESSAGE, epoch)
             return
+        if self.vad_enabled:
+            audio_data, self.vad_stats = detect_speech(audio_data, SAMPLE_RATE)
+            print(f"[DialogueSystem] VAD: {self.vad_stats['speech_s']:.2f}s speech in {self.vad_stats['input_s']:.2f}s clip, "
+                  f"trimmed {self.vad_stats['trimmed_s']:.2f}s")
+            if len(audio_data) == 0:
+                # Nothing worth transcribing, so answer locally instead of calling the API
+                self.reply(NOT_UNDERSTOOD_MESSAGE, epoch)
+                return
         try:
-            audio_data = np.concatenate(self.audio_buffer)
             print(f"[DialogueSystem] Total audio samples: {len(audio_data)}, max amplitude: {np.max(np.abs(audio_data))}")
-            with tempfile.NamedTemporaryFile(suffix='.wav', delete=False) as temp_file:
-                sf.write(temp_file.name, audio_data, SAMPLE_RATE, format='WAV', subtype='PCM_16')
-                temp_file_path = temp_file.name
-            print(f"[DialogueSystem] Audio saved to temporary file: {temp_file_path}")
-            with open(temp_file_path, 'rb') as audio_file:
-                transcript = self.client.audio.transcriptions.create(
-                    model="whisper-1",
-                    file=audio_file,
-                    response_format="text"
-                )
-            os.unlink(temp_file_path)
+            upload = encode_audio(audio_data, SAMPLE_RATE, self.stt_format, self.stt_sample_rate)
+            print(f"[DialogueSystem] Encoded {upload[0]} for upload: {len(upload[1])} bytes")
+            transcript = self.backend.transcribe(upload, STT_MODEL)
             if transcript.strip():
                 print(f"[DialogueSystem] Transcribed audio: {transcript}")
-                self.conversation_history.append({"role": "user", "content": transcript.strip()})
-                self.send_text_message(transcript.strip())
+                self.send_text_message(transcript.strip(), epoch)
             else:
                 print("[DialogueSystem] No speech detected in audio")
-                self.npc_message = "I didn't catch that. Could you repeat?"
-                self.generate_tts(self.npc_message)
-            self.audio_buffer = []
+                self.reply(NOT_UNDERSTOOD_MESSAGE, epoch)
         except Exception as e:
             print(f"[DialogueSystem] Audio transcription error: {e}")
-            self.npc_message = f"Sorry, I couldn't process your audio: {str(e)}. Try typing instead."
-            self.generate_tts(self.npc_message)
-            self.audio_buffer = []
+            self.reply(f"Sorry, I couldn't process your audio: {str(e)}. Try typing instead.", epoch)
+
+    def get_voice(self, npc_role=None):
+        return NPC_VOICES.get(npc_role or self.current_npc, "echo")
 
-    def generate_tts(self, text):
+    def generate_tts(self, text, generation=None):
+        start_time = time.time()
+        first_audio_time = None
+        total_bytes = 0
         try:
-            response = self.client.audio.speech.create(
-                model="tts-1",
-                voice="alloy" if self.current_npc == "HR" else "echo",
-                input=text,
-                response_format="pcm"
-            )
-            audio_data = response.read()
-            print(f"[DialogueSystem] Generated TTS: {len(audio_data)} bytes")
-            self.audio_player.add_data(audio_data)
+            voice = self.get_voice()
+            cached = self.tts_cache.get(TTS_MODEL, voice, text) if self.tts_cache else None
+            if cached is not None:
+                if not self.play_audio(cached, generation):
+                    return
+                self.record_tts_metrics(start_time, time.time() - start_time, cached.nbytes, cached=True)
+                return
+            chunks = []
+            if self.tts_streaming:
+                remainder = b""
+                stream = self.backend.stream_speech(text, voice, TTS_MODEL, self.backend.chunk_bytes)
+                try:
+                    for chunk in stream:
+                        # Chunks can split an int16 sample, so carry the odd byte over
+                        chunk = remainder + chunk
+                        usable = len(chunk) - len(chunk) % 2
+                        remainder = chunk[usable:]
+                        if not usable:
+                            continue
+                        if not self.play_audio(chunk[:usable], generation):
+                            print("[DialogueSystem] TTS interrupted")
+                            return
+                        if first_audio_time is None:
+                            first_audio_time = time.time() - start_time
+                        chunks.append(chunk[:usable])
+                        total_bytes += usable
+                finally:
+                    stream.close()
+            else:
+                audio_data = self.backend.synthesize(text, voice, TTS_MODEL)
+                if not self.play_audio(audio_data, generation):
+                    return
+                first_audio_time = time.time() - start_time
+                chunks.append(audio_data)
+                total_bytes = len(audio_data)
+            if self.tts_cache:
+                self.tts_cache.put(TTS_MODEL, voice, text, b"".join(chunks))
+            self.record_tts_metrics(start_time, first_audio_time, total_bytes)
         except Exception as e:
             print(f"[DialogueSystem] TTS error: {e}")
-            self.npc_message = "Audio unavailable, please use text input."
+            self.post_message("Audio unavailable, please use text input.")
+
+    def prewarm_tts_cache(self):
+        lines = [(NPC_VOICES[role], greeting) for role, greeting in GREETINGS.items()]
+        lines += [(voice, text) for voice in NPC_VOICES.values() for text in FALLBACK_MESSAGES]
+        warmed = 0
+        for voice, text in lines:
+            if self.tts_cache.contains(TTS_MODEL, voice, text):
+                continue
+            try:
+                self.tts_cache.put(TTS_MODEL, voice, text, self.backend.synthesize(text, voice, TTS_MODEL))
+                warmed += 1
+            except Exception as e:
+                print(f"[DialogueSystem] TTS pre-warm error: {e}")
+                return
+        print(f"[DialogueSystem] TTS cache pre-warmed {warmed} of {len(lines)} fixed lines")
+
+    def record_tts_metrics(self, start_time, first_audio_time, total_bytes, cached=False):
+        self.tts_metrics = {
+            "streaming": self.tts_streaming,
+            "cached": cached,
+            "time_to_first_audio": first_audio_time,
+            "total_time": time.time() - start_time,
+            "bytes": total_bytes,
+        }
+        if first_audio_time is not None:
+            self.tts_first_audio_times.append(first_audio_time)
+            source = "cache" if cached else "API"
+            print(f"[DialogueSystem] Generated TTS from {source}: {total_bytes} bytes, first audio after {first_audio_time * 1000:.0f} ms")
+        else:
+            print("[DialogueSystem] Generated TTS: no audio returned")
+
+    def get_tts_stats(self):
+        # Appended from the TTS worker, so snapshot before doing the maths
+        samples = np.array(tuple(self.tts_first_audio_times)) * 1000
+        stats = {"last": dict(self.tts_metrics), "samples": len(samples)}
+        if len(samples):
+            stats["first_audio_p50_ms"] = round(float(np.percentile(samples, 50)), 1)
+            stats["first_audio_p95_ms"] = round(float(np.percentile(samples, 95)), 1)
+        return stats
 
     def start_conversation(self, npc_role="HR", player_pos=None):
         self.active = True
@@ -157,8 +353,8 @@ class DialogueSystem:
         print(f"[DialogueSystem] Dialogue started with {npc_role}")
 
         if self.audio_player:
-            self.audio_player.stop()
-            self.audio_player.reset_frame_count()
+            self.cancel_speech()
+        self.open_mic()
 
         base_prompt = """Interaction Framework:
             - Maintain consistent personality throughout conversation
@@ -198,42 +394,84 @@ class DialogueSystem:
                 - On interruption: "Hold on, let's pivot to your new question. What's up?"
                 VOICE: Authoritative, confident tone (echo voice)"""
 
-        self.conversation_history = [{"role": "system", "content": system_prompt}]
-        initial_message = {
-            "HR": "Hello there, I am Sarah Chen, HR Director at Venture Builder AI. How can I assist you today?",
-            "CEO": "Hello there, I am Michael Chen, CEO at Venture Builder AI. What can I do for you today?"
-        }
-        self.npc_message = initial_message[npc_role]
-        self.conversation_history.append({"role": "assistant", "content": self.npc_message})
+        self.conversation_history.reset(system_prompt)
+        self.npc_message = GREETINGS[npc_role]
+        self.conversation_history.append("assistant", self.npc_message)
         print(f"[DialogueSystem] Initial NPC message: {self.npc_message}")
-        self.generate_tts(self.npc_message)
+        self.speak(self.npc_message)
 
-    def send_text_message(self, user_message=None):
+    def send_text_message(self, user_message=None, epoch=None):
         if not self.conversation_history:
             print("[DialogueSystem] No conversation history to send.")
             return
+        if epoch is None:
+            epoch = self.conversation_history.epoch
+        if epoch != self.conversation_history.epoch:
+            print("[DialogueSystem] Dropped message from a previous conversation")
+            return
         if user_message:
-            self.conversation_history.append({"role": "user", "content": user_message})
+            self.conversation_history.append("user", user_message, epoch)
         try:
-            response = self.client.chat.completions.create(
-                model="gpt-4o-2024-08-06",
-                messages=self.conversation_history,
-                temperature=0.85,
-                max_tokens=150,
-                response_format={"type": "text"},
-                top_p=0.95,
-                frequency_penalty=0.2,
-                presence_penalty=0.1
-            )
-            ai_message = response.choices[0].message.content
-            self.conversation_history.append({"role": "assistant", "content": ai_message})
-            self.npc_message = ai_message
+            generation = self.tts_generation
+            if self.chat_streaming:
+                deltas = self.backend.stream_chat(self.conversation_history.messages(), CHAT_MODEL, **CHAT_PARAMS)
+                ai_message = self.consume_chat_stream(deltas, generation, epoch)
+            else:
+                ai_message = self.backend.complete(self.conversation_history.messages(), CHAT_MODEL, **CHAT_PARAMS)
+            if epoch != self.conversation_history.epoch:
+                print("[DialogueSystem] Dropped reply from a previous conversation")
+                return
+            if not self.chat_streaming:
+                self.reply(ai_message, epoch, generation)
+            self.conversation_history.append("assistant", ai_message, epoch)
             print(f"[DialogueSystem] NPC says: {ai_message}")
-            self.generate_tts(ai_message)
+            if self.conversation_history.claim_summary():
+                self.submit_job(self.summarize_history, ordered=False)
         except Exception as e:
-            self.npc_message = "I apologize, but I'm having trouble connecting right now."
             print(f"[DialogueSystem] Text error: {e}")
-            self.generate_tts(self.npc_message)
+            self.reply(CONNECTION_ERROR_MESSAGE, epoch)
+
+    def summarize_history(self):
+        epoch, summary, batch = self.conversation_history.take_summary_batch()
+        transcript = "\n".join(f"{turn['role']}: {turn['content']}" for turn in batch)
+        if summary:
+            transcript = f"Earlier summary: {summary}\n{transcript}"
+        try:
+            messages = [
+                {"role": "system", "content": "Summarize this conversation between a visitor and an NPC in under 120 words. "
+                                              "Keep names, facts, requests and commitments; drop small talk."},
+                {"role": "user", "content": transcript}
+            ]
+            new_summary = self.backend.complete(messages, SUMMARY_MODEL, endpoint="summary", temperature=0.2, max_tokens=200).strip()
+        except Exception as e:
+            print(f"[DialogueSystem] History summary error: {e}")
+            self.conversation_history.abort_summary(epoch)
+            return
+        if self.conversation_history.apply_summary(epoch, batch, new_summary):
+            print(f"[DialogueSystem] Folded {len(batch)} turns into summary, history now ~{self.conversation_history.token_count()} tokens")
+
+    def consume_chat_stream(self, deltas, generation, epoch=None):
+        ai_message = ""
+        pending = ""
+        for delta in deltas:
+            if generation != self.tts_generation or (epoch is not None and epoch != self.conversation_history.epoch):
+                print("[DialogueSystem] Chat stream interrupted")
+                deltas.close()
+                # The unfinished sentence belongs to the cancelled reply, so it is not spoken either
+                pending = ""
+                break
+            ai_message += delta
+            pending += delta
+            self.post_message(ai_message, epoch)
+            # Hand finished sentences to TTS while the model keeps generating
+            sentences, remainder = split_sentences(pending)
+            ready = " ".join(sentences)
+            if len(ready) >= MIN_TTS_SENTENCE_CHARS:
+                self.speak(ready, generation)
+                pending = remainder
+        if pending.strip():
+            self.speak(pending.strip(), generation)
+        return ai_message
 
     def handle_input(self, event):
         if not self.active:
@@ -244,34 +482,30 @@ class DialogueSystem:
                 self.active = False
                 self.input_active = False
                 self.speech_mode = False
-                self.recording = False
-                self.is_recording_key_held = False
-                self.audio_player.stop()
-                print("[DialogueSystem] Chat ended")
+                self.stop_recording()
+                self.close_mic()
+                self.cancel_speech()
+                print(f"[DialogueSystem] Chat ended, playback stats: {self.audio_player.get_stats()}")
+                print(f"[DialogueSystem] TTS stats: {self.get_tts_stats()}")
                 return {"command": "move_player_back", "position": self.initial_player_pos}
             if event.key == pygame.K_m:
                 self.speech_mode = not self.speech_mode
                 if not self.speech_mode:
-                    self.recording = False
-                    self.is_recording_key_held = False
+                    self.stop_recording()
                 print(f"[DialogueSystem] Speech mode {'enabled' if self.speech_mode else 'disabled'}")
             if event.key == pygame.K_SPACE and self.speech_mode and not self.recording:
-                self.audio_player.stop()
-                self.audio_player.reset_frame_count()
+                self.cancel_speech()
                 print("[DialogueSystem] Stopped NPC audio for new recording")
-                self.is_recording_key_held = True
-                self.recording = True
-                asyncio.run_coroutine_threadsafe(self.record_mic_audio(), self.loop)
+                self.start_recording()
                 print("[DialogueSystem] Started recording (SPACE held)")
             if event.key == pygame.K_RETURN:
                 if self.speech_mode:
                     pass
                 elif self.user_input.strip():
-                    self.audio_player.stop()
-                    self.audio_player.reset_frame_count()
+                    self.cancel_speech()
                     print("[DialogueSystem] Stopped NPC audio for new text input")
                     print(f"[DialogueSystem] User said: {self.user_input}")
-                    self.send_text_message(self.user_input.strip())
+                    self.submit_job(self.send_text_message, self.user_input.strip(), self.conversation_history.epoch)
                     self.user_input = ""
             elif event.key == pygame.K_BACKSPACE:
                 self.user_input = self.user_input[:-1]
@@ -280,22 +514,30 @@ class DialogueSystem:
         if event.type == pygame.KEYUP:
             if event.key == pygame.K_SPACE and self.speech_mode and self.recording:
                 print("[DialogueSystem] SPACE key released, stopping recording")
-                self.is_recording_key_held = False
-                self.recording = False
-                asyncio.run_coroutine_threadsafe(self.process_audio_input(), self.loop)
+                self.finish_recording()
                 print("[DialogueSystem] Stopped recording and processing audio (SPACE released)")
 
-    def render_text(self, surface, text, x, y):
-        max_width = WINDOW_WIDTH - 40
-        line_height = 25
-        words = text.split()
+    def measure_word(self, word):
+        key = (self.font, word)
+        width = self.word_width_cache.get(key)
+        if width is None:
+            if len(self.word_width_cache) >= WORD_WIDTH_CACHE_SIZE:
+                self.word_width_cache.clear()
+            width = self.word_width_cache[key] = self.font.size(word + ' ')[0]
+        return width
+
+    def get_text_layout(self, text, max_width):
+        key = (text, self.font, max_width)
+        line_surfaces = self.text_layout_cache.get(key)
+        if line_surfaces is not None:
+            self.text_layout_cache.move_to_end(key)
+            return line_surfaces
         lines = []
         current_line = []
         current_width = 0
         text_color = (255, 255, 255)
-        for word in words:
-            word_surface = self.font.render(word + ' ', True, text_color)
-            word_width = word_surface.get_width()
+        for word in text.split():
+            word_width = self.measure_word(word)
             if current_width + word_width <= max_width:
                 current_line.append(word)
                 current_width += word_width
@@ -305,60 +547,102 @@ class DialogueSystem:
                 current_width = word_width
         if current_line:
             lines.append(' '.join(current_line))
-        for i, line in enumerate(lines):
-            text_surface = self.font.render(line, True, text_color)
+        line_surfaces = [self.font.render(line, True, text_color) for line in lines]
+        self.text_layout_cache[key] = line_surfaces
+        if len(self.text_layout_cache) > TEXT_LAYOUT_CACHE_SIZE:
+            self.text_layout_cache.popitem(last=False)
+        return line_surfaces
+
+    def render_text(self, surface, text, x, y):
+        max_width = WINDOW_WIDTH - 40
+        line_height = 25
+        line_surfaces = self.get_text_layout(text, max_width)
+        for i, text_surface in enumerate(line_surfaces):
             surface.blit(text_surface, (x, y + i * line_height))
-        return len(lines) * line_height
+        return len(line_surfaces) * line_height
 
-    def render(self):
-        if not self.active:
-            return
+    def get_input_prompt(self):
+        if not self.input_active:
+            return None
+        if self.thinking and not self.recording:
+            return "> (Thinking...)"
+        if not self.speech_mode:
+            return "> " + self.user_input + "_"
+        return "> (Recording...)" if self.recording else "> (Hold SPACE to record)"
+
+    def draw_ui(self):
         self.ui_surface.fill((0, 0, 0, 0))
-        box_height = 200
-        box_y = WINDOW_HEIGHT - box_height - 20
         box_color = (0, 0, 0, 230)
-        pygame.draw.rect(self.ui_surface, box_color, (20, box_y, WINDOW_WIDTH - 40, box_height))
-        pygame.draw.rect(self.ui_surface, (255, 255, 255, 255), (20, box_y, WINDOW_WIDTH - 40, box_height), 2)
+        box_rect = (20, self.box_y, WINDOW_WIDTH - 40, self.box_height)
+        pygame.draw.rect(self.ui_surface, box_color, box_rect)
+        pygame.draw.rect(self.ui_surface, (255, 255, 255, 255), box_rect, 2)
         instruction_text = "Hold SPACE to record, release to send, M to toggle mic, Shift+Q to exit"
         quit_text_surface = self.font.render(instruction_text, True, (255, 255, 255))
-        self.ui_surface.blit(quit_text_surface, (40, box_y + 10))
-        if self.npc_message:
-            self.render_text(self.ui_surface, self.npc_message, 40, box_y + 40)
-        if self.input_active:
-            input_prompt = "> " + self.user_input + "_" if not self.speech_mode else "> (Recording...)" if self.recording else "> (Hold SPACE to record)"
-            input_surface = self.font.render(input_prompt, True, (255, 255, 255))
-            self.ui_surface.blit(input_surface, (40, box_y + box_height - 40))
-        texture_data = pygame.image.tostring(self.ui_surface, "RGBA", True)
-        glPushAttrib(GL_ALL_ATTRIB_BITS)
-        glMatrixMode(GL_PROJECTION)
+        self.ui_surface.blit(quit_text_surface, (40, self.box_y + 10))
+        if self.rendered_message:
+            self.render_text(self.ui_surface, self.rendered_message, 40, self.box_y + 40)
+        if self.rendered_prompt:
+            input_surface = self.font.render(self.rendered_prompt, True, (255, 255, 255))
+            self.ui_surface.blit(input_surface, (40, self.box_y + self.box_height - 40))
+
+    def update_ui_texture(self):
+        if self.npc_message != self.rendered_message:
+            self.rendered_message = self.npc_message
+            self.ui_dirty_rects.append(self.message_rect)
+        input_prompt = self.get_input_prompt()
+        if input_prompt != self.rendered_prompt:
+            self.rendered_prompt = input_prompt
+            self.ui_dirty_rects.append(self.input_rect)
+        if not self.ui_dirty_rects:
+            return
+        # Redraw and upload only the union of the changed regions
+        dirty_rect = self.ui_dirty_rects[0].unionall(self.ui_dirty_rects[1:])
+        self.ui_dirty_rects = []
+        self.ui_surface.set_clip(dirty_rect)
+        self.draw_ui()
+        self.ui_surface.set_clip(None)
+        texture_data = pygame.image.tostring(self.ui_surface.subsurface(dirty_rect), "RGBA", True)
+        gl_state.bind_texture(GL_TEXTURE_2D, self.ui_texture)
+        glTexSubImage2D(GL_TEXTURE_2D, 0, dirty_rect.x, WINDOW_HEIGHT - dirty_rect.bottom,
+                        dirty_rect.width, dirty_rect.height, GL_RGBA, GL_UNSIGNED_BYTE, texture_data)
+
+    def render(self):
+        if not self.active:
+            return
+        self.update_ui_texture()
+        gl_state.matrix_mode(GL_PROJECTION)
         glPushMatrix()
         glLoadIdentity()
         glOrtho(0, WINDOW_WIDTH, 0, WINDOW_HEIGHT, -1, 1)
-        glMatrixMode(GL_MODELVIEW)
+        gl_state.matrix_mode(GL_MODELVIEW)
         glPushMatrix()
         glLoadIdentity()
-        glDisable(GL_DEPTH_TEST)
-        glEnable(GL_BLEND)
-        glBlendFunc(GL_SRC_ALPHA, GL_ONE_MINUS_SRC_ALPHA)
-        glEnable(GL_TEXTURE_2D)
-        glBindTexture(GL_TEXTURE_2D, self.ui_texture)
-        glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_MIN_FILTER, GL_LINEAR)
-        glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_MAG_FILTER, GL_LINEAR)
-        glTexImage2D(GL_TEXTURE_2D, 0, GL_RGBA, WINDOW_WIDTH, WINDOW_HEIGHT, 0, GL_RGBA, GL_UNSIGNED_BYTE, texture_data)
+        gl_state.disable(GL_DEPTH_TEST)
+        gl_state.disable(GL_LIGHTING)
+        gl_state.enable(GL_BLEND)
+        gl_state.blend_func(GL_SRC_ALPHA, GL_ONE_MINUS_SRC_ALPHA)
+        gl_state.enable(GL_TEXTURE_2D)
+        gl_state.bind_texture(GL_TEXTURE_2D, self.ui_texture)
+        gl_state.color(1, 1, 1, 1)
         glBegin(GL_QUADS)
         glTexCoord2f(0, 0); glVertex2f(0, 0)
         glTexCoord2f(1, 0); glVertex2f(WINDOW_WIDTH, 0)
         glTexCoord2f(1, 1); glVertex2f(WINDOW_WIDTH, WINDOW_HEIGHT)
         glTexCoord2f(0, 1); glVertex2f(0, WINDOW_HEIGHT)
         glEnd()
-        glMatrixMode(GL_PROJECTION)
+        gl_state.matrix_mode(GL_PROJECTION)
         glPopMatrix()
-        glMatrixMode(GL_MODELVIEW)
+        gl_state.matrix_mode(GL_MODELVIEW)
         glPopMatrix()
-        glPopAttrib()
+        # Restore only what the 3D pass relies on instead of pushing every attribute group
+        gl_state.disable(GL_TEXTURE_2D)
+        gl_state.enable(GL_LIGHTING)
+        gl_state.enable(GL_DEPTH_TEST)
 
     def __del__(self):
+        self.mic.close()
         self.audio_player.terminate()
+        self.executor.shutdown(wait=False)
         if self.loop:
             self.loop.call_soon_threadsafe(self.loop.stop)
-            self.loop_thread.join()
\ No newline at end of file
+            self.loop_thread.join()
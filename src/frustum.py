@@ -0,0 +1,48 @@
+import numpy as np
+from OpenGL.GL import *
+
+class Frustum:
+    # Six planes (a, b, c, d) with inward-facing unit normals: a point is inside when a*x + b*y + c*z + d >= 0
+    def __init__(self, planes, eye=None):
+        self.planes = planes
+        self.eye = eye
+        self.normals = planes[:, :3]
+        self.offsets = planes[:, 3]
+
+    @classmethod
+    def from_matrices(cls, modelview, projection):
+        # GL matrices come back column-major, so row vectors transform as p @ modelview @ projection
+        modelview = np.asarray(modelview, dtype=np.float64).reshape(4, 4)
+        clip = modelview @ np.asarray(projection, dtype=np.float64).reshape(4, 4)
+        w = clip[:, 3]
+        planes = np.array([
+            w + clip[:, 0], w - clip[:, 0],
+            w + clip[:, 1], w - clip[:, 1],
+            w + clip[:, 2], w - clip[:, 2],
+        ])
+        planes /= np.linalg.norm(planes[:, :3], axis=1)[:, None]
+        # The eye sits at the origin of eye space, so its world position is the inverse modelview's translation
+        eye = tuple(np.linalg.inv(modelview)[3, :3])
+        return cls(planes, eye)
+
+    @classmethod
+    def from_gl(cls):
+        return cls.from_matrices(glGetFloatv(GL_MODELVIEW_MATRIX), glGetFloatv(GL_PROJECTION_MATRIX))
+
+    def contains_sphere(self, center, radius):
+        distances = self.normals @ np.asarray(center, dtype=np.float64) + self.offsets
+        return bool(np.all(distances >= -radius))
+
+    def intersects_aabb(self, bounds_min, bounds_max):
+        return bool(self.aabbs_visible(np.asarray([bounds_min]), np.asarray([bounds_max]))[0])
+
+    def aabbs_visible(self, mins, maxs):
+        # For each plane test the box corner furthest along its normal; if even that is behind, the box is out
+        positive = self.normals >= 0
+        corners = np.where(positive[None, :, :], maxs[:, None, :], mins[:, None, :])
+        distances = np.einsum('bpk,pk->bp', corners, self.normals) + self.offsets
+        return np.all(distances >= 0, axis=1)
+
+    def spheres_visible(self, centers, radii):
+        distances = centers @ self.normals.T + self.offsets
+        return np.all(distances >= -np.asarray(radii)[:, None], axis=1)
@@ -0,0 +1,101 @@
+import threading
+
+HISTORY_TOKEN_BUDGET = 2000
+HISTORY_KEEP_RECENT = 6
+SUMMARY_TRIGGER = 0.75
+CHARS_PER_TOKEN = 4
+MESSAGE_OVERHEAD_TOKENS = 4
+
+def estimate_tokens(message):
+    # Rough English-text estimate; good enough to keep prompt growth bounded
+    return len(message["content"]) // CHARS_PER_TOKEN + MESSAGE_OVERHEAD_TOKENS
+
+class ConversationHistory:
+    def __init__(self, token_budget=HISTORY_TOKEN_BUDGET, keep_recent=HISTORY_KEEP_RECENT):
+        self.token_budget = token_budget
+        self.keep_recent = keep_recent
+        self.lock = threading.Lock()
+        self.system_prompt = None
+        self.summary = ""
+        self.turns = []
+        self.summarizing = False
+        # Bumped on reset so a summary of a previous conversation is never applied
+        self.epoch = 0
+
+    def __len__(self):
+        with self.lock:
+            return len(self.turns) + (1 if self.system_prompt else 0)
+
+    def reset(self, system_prompt):
+        with self.lock:
+            self.system_prompt = {"role": "system", "content": system_prompt}
+            self.summary = ""
+            self.turns = []
+            self.summarizing = False
+            self.epoch += 1
+
+    def append(self, role, content, epoch=None):
+        with self.lock:
+            # A turn from a conversation that has since been reset is dropped
+            if epoch is not None and epoch != self.epoch:
+                return False
+            # Only an immediate repeat of the last turn is collapsed, e.g. the same line resent after an error
+            if self.turns and self.turns[-1]["role"] == role and self.turns[-1]["content"] == content:
+                return False
+            self.turns.append({"role": role, "content": content})
+            return True
+
+    def _head(self):
+        head = [self.system_prompt] if self.system_prompt else []
+        if self.summary:
+            head.append({"role": "system", "content": f"Summary of the conversation so far: {self.summary}"})
+        return head
+
+    def messages(self):
+        with self.lock:
+            head = self._head()
+            budget = self.token_budget - sum(estimate_tokens(m) for m in head)
+            recent = []
+            used = 0
+            # Newest turns win; anything older that does not fit waits for the summarizer
+            for turn in reversed(self.turns):
+                cost = estimate_tokens(turn)
+                if recent and used + cost > budget:
+                    break
+                recent.append(turn)
+                used += cost
+            return head + recent[::-1]
+
+    def token_count(self):
+        with self.lock:
+            return sum(estimate_tokens(m) for m in self._head() + self.turns)
+
+    def claim_summary(self):
+        # Marks a summary as in flight so only one fold runs at a time
+        with self.lock:
+            if self.summarizing or len(self.turns) <= self.keep_recent:
+                return False
+            total = sum(estimate_tokens(m) for m in self._head() + self.turns)
+            self.summarizing = total > self.token_budget * SUMMARY_TRIGGER
+            return self.summarizing
+
+    def take_summary_batch(self):
+        with self.lock:
+            return self.epoch, self.summary, list(self.turns[:-self.keep_recent])
+
+    def apply_summary(self, epoch, batch, summary):
+        with self.lock:
+            # A stale summary must not release the claim held by the current conversation
+            if epoch != self.epoch:
+                return False
+            self.summarizing = False
+            if self.turns[:len(batch)] != batch:
+                return False
+            self.turns = self.turns[len(batch):]
+            self.summary = summary
+            return True
+
+    def abort_summary(self, epoch):
+        with self.lock:
+            if epoch == self.epoch:
+                self.summarizing = False
@@ -0,0 +1,143 @@
+import numpy as np
+from config import GAME_MAP, OFFICE_PROPS, WORLD_TILE_SIZE, LEVEL_CHUNK_TILES, LEVEL_MAP_PATH
+
+WALL_TILE = 'W'
+FLOOR_TILE = '.'
+WALL_HEIGHT = 2.0
+# Half-width of each prop's footprint, padded for rotation; only used to grow chunk bounds
+PROP_EXTENTS = {'desk': 0.5, 'chair': 0.25, 'partition': 1.0, 'plant': 0.2}
+# Parts of the partition cube hang below the floor, so chunk bounds start slightly underneath
+BOUNDS_FLOOR = -0.5
+
+class Chunk:
+    def __init__(self, col, row):
+        self.col = col
+        self.row = row
+        self.floor = []
+        self.walls = []
+        self.props = []
+        self.bounds_min = None
+        self.bounds_max = None
+
+    def grow(self, x0, z0, x1, z1):
+        low = np.array([x0, BOUNDS_FLOOR, z0])
+        high = np.array([x1, WALL_HEIGHT, z1])
+        self.bounds_min = low if self.bounds_min is None else np.minimum(self.bounds_min, low)
+        self.bounds_max = high if self.bounds_max is None else np.maximum(self.bounds_max, high)
+
+    def is_empty(self):
+        return not (self.floor or self.walls or self.props)
+
+class Level:
+    def __init__(self, tiles, props=(), tile_size=WORLD_TILE_SIZE, chunk_tiles=LEVEL_CHUNK_TILES):
+        self.tiles = [row for row in tiles]
+        self.rows = len(self.tiles)
+        self.cols = max(len(row) for row in self.tiles)
+        self.tile_size = tile_size
+        self.chunk_tiles = chunk_tiles
+        self.width = self.cols * tile_size
+        self.depth = self.rows * tile_size
+        # The map is centred on the world origin
+        self.origin = (-self.width / 2, -self.depth / 2)
+        self.props = [tuple(prop) for prop in props]
+        self.chunks = self.build_chunks()
+
+    def tile(self, col, row):
+        if 0 <= row < self.rows and 0 <= col < len(self.tiles[row]):
+            return self.tiles[row][col]
+        return None
+
+    def is_wall(self, col, row):
+        return self.tile(col, row) == WALL_TILE
+
+    def is_floor(self, col, row):
+        tile = self.tile(col, row)
+        return tile is not None and tile != WALL_TILE
+
+    def tile_origin(self, col, row):
+        return self.origin[0] + col * self.tile_size, self.origin[1] + row * self.tile_size
+
+    def tile_at(self, x, z):
+        return int((x - self.origin[0]) // self.tile_size), int((z - self.origin[1]) // self.tile_size)
+
+    def chunk_key(self, col, row):
+        return (min(max(col, 0), self.cols - 1) // self.chunk_tiles,
+                min(max(row, 0), self.rows - 1) // self.chunk_tiles)
+
+    def build_chunks(self):
+        chunks = {}
+
+        def chunk_for(col, row):
+            key = self.chunk_key(col, row)
+            if key not in chunks:
+                chunks[key] = Chunk(*key)
+            return chunks[key]
+
+        size = self.tile_size
+        for row in range(self.rows):
+            run_start = None
+            for col in range(self.cols + 1):
+                # Consecutive floor tiles in a row (within one chunk) merge into one quad
+                floor = col < self.cols and self.is_floor(col, row)
+                if run_start is not None and (not floor or col % self.chunk_tiles == 0):
+                    x0, z0 = self.tile_origin(run_start, row)
+                    x1 = x0 + (col - run_start) * size
+                    chunk = chunk_for(run_start, row)
+                    chunk.floor.append((x0, z0, x1, z0 + size))
+                    chunk.grow(x0, z0, x1, z0 + size)
+                    run_start = None
+                if floor and run_start is None:
+                    run_start = col
+        for row in range(self.rows):
+            for col in range(self.cols):
+                if not self.is_wall(col, row):
+                    continue
+                x0, z0 = self.tile_origin(col, row)
+                x1, z1 = x0 + size, z0 + size
+                chunk = chunk_for(col, row)
+                # Only faces that border walkable floor can ever be seen
+                faces = [
+                    ((0, -1), (x0, z0, x1, z0), (0, -1)),
+                    ((0, 1), (x1, z1, x0, z1), (0, 1)),
+                    ((-1, 0), (x0, z1, x0, z0), (-1, 0)),
+                    ((1, 0), (x1, z0, x1, z1), (1, 0)),
+                ]
+                visible = [segment + normal for (dc, dr), segment, normal in faces if self.is_floor(col + dc, row + dr)]
+                if visible:
+                    chunk.walls.extend(visible)
+                    chunk.grow(x0, z0, x1, z1)
+        for prop in self.props:
+            kind, x, z = prop[0], prop[1], prop[2]
+            extent = PROP_EXTENTS.get(kind, self.tile_size)
+            chunk = chunk_for(*self.tile_at(x, z))
+            chunk.props.append(prop)
+            chunk.grow(x - extent, z - extent, x + extent, z + extent)
+        return [chunk for _, chunk in sorted(chunks.items()) if not chunk.is_empty()]
+
+def parse_level(lines, tile_size=WORLD_TILE_SIZE, chunk_tiles=LEVEL_CHUNK_TILES):
+    # Map rows first, then optional "kind x z [rotation]" prop lines; '#' starts a comment
+    tiles = []
+    props = []
+    for line in lines:
+        line = line.split('#', 1)[0].rstrip()
+        if not line:
+            continue
+        parts = line.split()
+        if len(parts) > 1:
+            props.append((parts[0], *map(float, parts[1:])))
+        else:
+            tiles.append(parts[0])
+    if not tiles:
+        raise ValueError("Level has no tile rows")
+    return Level(tiles, props, tile_size, chunk_tiles)
+
+def load_level(path, tile_size=WORLD_TILE_SIZE, chunk_tiles=LEVEL_CHUNK_TILES):
+    with open(path) as f:
+        level = parse_level(f, tile_size, chunk_tiles)
+    print(f"[Level] Loaded {path}: {level.cols}x{level.rows} tiles, {len(level.chunks)} chunks")
+    return level
+
+def default_level():
+    if LEVEL_MAP_PATH:
+        return load_level(LEVEL_MAP_PATH)
+    return Level(GAME_MAP, OFFICE_PROPS)
@@ -5,78 +5,143 @@ from OpenGL.GL import *
 from OpenGL.GLU import *
 import sys
 from dotenv import load_dotenv
-from openai import OpenAI
+from openai_client import create_client
+from backends import OpenAIBackend, FakeBackend
 from dialogue import DialogueSystem
 from world import World
+from frustum import Frustum
 from player import Player
 from npc import NPC
+from spatial import NPCRegistry
+from collision import OccupancyGrid
+from crowd import Crowd
 from menu import MenuScreen
+from render_state import gl_state
+from profiler import FrameProfiler
 from config import *
 import time
 import math
 
-# Load environment variables
-load_dotenv()
-api_key = os.getenv('OPENAI_API_KEY')
-if not api_key:
-    print("[OpenAI] API key not found. Please set OPENAI_API_KEY in your .env file.")
-    sys.exit(1)
-client = OpenAI(api_key=api_key)
-print("[OpenAI] API key loaded successfully.")
+def create_backend():
+    # Load environment variables
+    load_dotenv()
+    if os.getenv('VBAI_BACKEND') == 'fake':
+        # Offline stand-in for load testing without the live API
+        print("[Backend] Using fake speech/LLM backend.")
+        return FakeBackend.from_env()
+    api_key = os.getenv('OPENAI_API_KEY')
+    if not api_key:
+        print("[OpenAI] API key not found. Please set OPENAI_API_KEY in your .env file.")
+        sys.exit(1)
+    print("[OpenAI] API key loaded successfully.")
+    return OpenAIBackend(create_client(api_key))
 
-# Initialize Pygame
-pygame.init()
-try:
-    pygame.mixer.init(frequency=44100, size=-16, channels=1, buffer=4096)
-except Exception as e:
-    print(f"[Pygame] Mixer initialization error: {e}")
-display = (WINDOW_WIDTH, WINDOW_HEIGHT)
-pygame.display.gl_set_attribute(pygame.GL_CONTEXT_MAJOR_VERSION, 2)
-pygame.display.gl_set_attribute(pygame.GL_CONTEXT_MINOR_VERSION, 1)
-pygame.display.set_mode(display, DOUBLEBUF | OPENGL)
-screen = pygame.display.get_surface()
+def init_display(flags=0):
+    # Initialize Pygame
+    pygame.init()
+    try:
+        pygame.mixer.init(frequency=44100, size=-16, channels=1, buffer=4096)
+    except Exception as e:
+        print(f"[Pygame] Mixer initialization error: {e}")
+    display = (WINDOW_WIDTH, WINDOW_HEIGHT)
+    pygame.display.gl_set_attribute(pygame.GL_CONTEXT_MAJOR_VERSION, 2)
+    pygame.display.gl_set_attribute(pygame.GL_CONTEXT_MINOR_VERSION, 1)
+    for vsync in dict.fromkeys((VSYNC, 1, 0) if VSYNC else (0,)):
+        try:
+            pygame.display.set_mode(display, DOUBLEBUF | OPENGL | flags, vsync=vsync)
+            break
+        except pygame.error as e:
+            print(f"[Pygame] vsync={vsync} not available: {e}")
+    return pygame.display.get_surface()
 
-# Set up the camera and perspective
-glEnable(GL_DEPTH_TEST)
-glMatrixMode(GL_PROJECTION)
-glLoadIdentity()
-gluPerspective(45, (display[0] / display[1]), 0.1, 50.0)
-glMatrixMode(GL_MODELVIEW)
+def init_gl():
+    # Set up the camera and perspective
+    gl_state.enable(GL_DEPTH_TEST)
+    gl_state.matrix_mode(GL_PROJECTION)
+    glLoadIdentity()
+    gluPerspective(FIELD_OF_VIEW, (WINDOW_WIDTH / WINDOW_HEIGHT), 0.1, 50.0)
+    gl_state.matrix_mode(GL_MODELVIEW)
 
-# Set up basic lighting
-glEnable(GL_LIGHTING)
-glEnable(GL_LIGHT0)
-glLightfv(GL_LIGHT0, GL_POSITION, [0, 5, 5, 1])
-glLightfv(GL_LIGHT0, GL_AMBIENT, [0.5, 0.5, 0.5, 1])
-glLightfv(GL_LIGHT0, GL_DIFFUSE, [1.0, 1.0, 1.0, 1])
+    # Set up basic lighting
+    gl_state.enable(GL_LIGHTING)
+    gl_state.enable(GL_LIGHT0)
+    glLightfv(GL_LIGHT0, GL_POSITION, [0, 5, 5, 1])
+    glLightfv(GL_LIGHT0, GL_AMBIENT, [0.5, 0.5, 0.5, 1])
+    glLightfv(GL_LIGHT0, GL_DIFFUSE, [1.0, 1.0, 1.0, 1])
 
-# Enable blending for transparency
-glEnable(GL_BLEND)
-glBlendFunc(GL_SRC_ALPHA, GL_ONE_MINUS_SRC_ALPHA)
+    # Enable blending for transparency
+    gl_state.enable(GL_BLEND)
+    gl_state.blend_func(GL_SRC_ALPHA, GL_ONE_MINUS_SRC_ALPHA)
 
-# Initial camera position
-glTranslatef(0.0, 0.0, -5)
+    # Initial camera position
+    glTranslatef(0.0, 0.0, -5)
 
 class Game3D:
-    def __init__(self):
+    def __init__(self, screen, backend):
+        self.backend = backend
         self.menu = MenuScreen(screen)
-        self.player = Player()
         self.world = World()
-        self.dialogue = DialogueSystem(client, screen)
-        self.hr_npc = NPC(-3.3, 0, -2, "HR")
-        self.ceo_npc = NPC(3.3, 0, 1, "CEO")
+        self.world.compile()
+        self.collision = OccupancyGrid.from_level(self.world.level)
+        self.player = Player(self.collision)
+        self.dialogue = DialogueSystem(backend, screen)
         self.interaction_distance = 2.0
+        self.npcs = NPCRegistry.from_level(self.world.level, self.interaction_distance)
+        self.npcs.add(NPC(-3.3, 0, -2, "HR"))
+        self.npcs.add(NPC(3.3, 0, 1, "CEO"))
+        for npc in self.npcs:
+            self.collision.add_obstacle(npc, npc.pos[0], npc.pos[2], NPC_COLLISION_RADIUS)
+        self.crowd = Crowd.spawn(self.world.level, self.collision, AMBIENT_NPC_COUNT) if AMBIENT_NPC_COUNT else None
         self.last_interaction_time = 0
+        # NPC the player just walked away from; it cannot re-trigger until the player leaves its radius
+        self.dismissed_npc = None
+        self.clock = pygame.time.Clock()
+        self.profiler = FrameProfiler()
+        self.sim_dt = 1.0 / SIM_HZ
+        self.accumulator = 0.0
+        self.last_frame_time = None
 
-    def move_player_away_from_npc(self, npc_pos):
-        dx = self.player.pos[0] - npc_pos[0]
-        dz = self.player.pos[2] - npc_pos[2]
+    def move_player_away_from_npc(self, npc):
+        x, z = self.player.pos[0], self.player.pos[2]
+        dx = x - npc.pos[0]
+        dz = z - npc.pos[2]
         distance = math.sqrt(dx * dx + dz * dz)
-        if distance > 0:
-            dx /= distance
-            dz /= distance
-            self.player.pos[0] = npc_pos[0] + (dx * 3)
-            self.player.pos[2] = npc_pos[2] + (dz * 3)
+        heading = math.atan2(dz, dx) if distance > 0 else 0.0
+        best, best_distance = (x, z), distance
+        # Back off along the same line first; if furniture stops the sweep short, try fanning out to the sides
+        for turn in (0, 45, -45, 90, -90, 135, -135, 180):
+            angle = heading + math.radians(turn)
+            target_x = npc.pos[0] + math.cos(angle) * 3
+            target_z = npc.pos[2] + math.sin(angle) * 3
+            end_x, end_z = self.collision.sweep(x, z, target_x - x, target_z - z)
+            end_distance = math.hypot(end_x - npc.pos[0], end_z - npc.pos[2])
+            if end_distance > best_distance:
+                best, best_distance = (end_x, end_z), end_distance
+            if end_distance >= self.interaction_distance:
+                break
+        self.player.pos[0], self.player.pos[2] = best
+        self.dismissed_npc = npc
+
+    def simulate(self, dt):
+        if self.crowd:
+            self.crowd.update(dt)
+        if not self.dialogue.active:
+            keys = pygame.key.get_pressed()
+            if keys[pygame.K_w]: self.player.move(0, -1, dt)
+            if keys[pygame.K_s]: self.player.move(0, 1, dt)
+            if keys[pygame.K_a]: self.player.move(-1, 0, dt)
+            if keys[pygame.K_d]: self.player.move(1, 0, dt)
+
+    def step_simulation(self):
+        now = time.perf_counter()
+        if self.last_frame_time is None:
+            self.last_frame_time = now
+        self.accumulator += min(now - self.last_frame_time, MAX_FRAME_TIME)
+        self.last_frame_time = now
+        # Fixed steps keep movement identical at any render rate
+        while self.accumulator >= self.sim_dt:
+            self.simulate(self.sim_dt)
+            self.accumulator -= self.sim_dt
 
     def run(self):
         running = True
@@ -88,63 +153,85 @@ class Game3D:
                     elif event.type == pygame.KEYDOWN:
                         if event.key == pygame.K_RETURN and time.time() - self.menu.start_time > (len(TITLE) / 15 + 1):
                             self.menu.active = False
+                            self.menu.release()
+                            self.last_frame_time = None
+                            # Keep-alive connections may have expired while the menu sat idle
+                            self.backend.warm_up()
                             pygame.mouse.set_visible(False)
                             pygame.event.set_grab(True)
                         elif event.key == pygame.K_ESCAPE:
                             running = False
-                self.menu.render()
+                if self.menu.active:
+                    self.menu.render()
+                self.clock.tick(FPS)
             else:
-                for event in pygame.event.get():
-                    if event.type == pygame.QUIT:
-                        running = False
-                    elif event.type == pygame.KEYDOWN or event.type == pygame.KEYUP:
-                        if event.key == pygame.K_ESCAPE and event.type == pygame.KEYDOWN:
-                            pygame.mouse.set_visible(True)
-                            pygame.event.set_grab(False)
+                self.profiler.begin_frame()
+                with self.profiler.scope("events"):
+                    for event in pygame.event.get():
+                        if event.type == pygame.QUIT:
                             running = False
-                        if self.dialogue.active:
-                            result = self.dialogue.handle_input(event)
-                            if isinstance(result, dict) and result.get("command") == "move_player_back":
-                                current_npc = self.hr_npc if self.dialogue.current_npc == "HR" else self.ceo_npc
-                                self.move_player_away_from_npc(current_npc.pos)
-                    elif event.type == pygame.MOUSEMOTION:
-                        x, y = event.rel
-                        self.player.update_rotation(x, y)
-                if not self.dialogue.active:
-                    keys = pygame.key.get_pressed()
-                    if keys[pygame.K_w]: self.player.move(0, -1)
-                    if keys[pygame.K_s]: self.player.move(0, 1)
-                    if keys[pygame.K_a]: self.player.move(-1, 0)
-                    if keys[pygame.K_d]: self.player.move(1, 0)
-                current_time = time.time()
-                if current_time - self.last_interaction_time > 0.5:
-                    dx = self.player.pos[0] - self.hr_npc.pos[0]
-                    dz = self.player.pos[2] - self.hr_npc.pos[2]
-                    hr_distance = math.sqrt(dx * dx + dz * dz)
-                    dx = self.player.pos[0] - self.ceo_npc.pos[0]
-                    dz = self.player.pos[2] - self.ceo_npc.pos[2]
-                    ceo_distance = math.sqrt(dx * dx + dz * dz)
-                    if hr_distance < self.interaction_distance and not self.dialogue.active:
-                        self.dialogue.start_conversation("HR", self.player.pos)
-                        self.last_interaction_time = current_time
-                    elif ceo_distance < self.interaction_distance and not self.dialogue.active:
-                        self.dialogue.start_conversation("CEO", self.player.pos)
-                        self.last_interaction_time = current_time
+                        elif event.type == pygame.KEYDOWN or event.type == pygame.KEYUP:
+                            if event.key == pygame.K_ESCAPE and event.type == pygame.KEYDOWN:
+                                pygame.mouse.set_visible(True)
+                                pygame.event.set_grab(False)
+                                running = False
+                            elif event.key == pygame.K_F3 and event.type == pygame.KEYDOWN:
+                                self.profiler.toggle_overlay()
+                            elif event.key == pygame.K_F4 and event.type == pygame.KEYDOWN:
+                                self.profiler.dump()
+                            if self.dialogue.active:
+                                result = self.dialogue.handle_input(event)
+                                if isinstance(result, dict) and result.get("command") == "move_player_back":
+                                    current_npc = self.npcs.by_role(self.dialogue.current_npc)
+                                    if current_npc:
+                                        self.move_player_away_from_npc(current_npc)
+                        elif event.type == pygame.MOUSEMOTION:
+                            x, y = event.rel
+                            self.player.update_rotation(x, y)
+                    self.dialogue.update()
+                with self.profiler.scope("interaction"):
+                    self.step_simulation()
+                    current_time = time.time()
+                    if current_time - self.last_interaction_time > 0.5 and not self.dialogue.active:
+                        x, z = self.player.pos[0], self.player.pos[2]
+                        dismissed = self.dismissed_npc
+                        if dismissed and math.hypot(x - dismissed.pos[0], z - dismissed.pos[2]) >= self.interaction_distance:
+                            self.dismissed_npc = None
+                        nearby = self.npcs.nearest(x, z, self.interaction_distance)
+                        if nearby and nearby is not self.dismissed_npc:
+                            self.dialogue.start_conversation(nearby.role, self.player.pos)
+                            self.last_interaction_time = current_time
                 glClear(GL_COLOR_BUFFER_BIT | GL_DEPTH_BUFFER_BIT)
                 glPushMatrix()
                 glRotatef(self.player.rot[0], 1, 0, 0)
                 glRotatef(self.player.rot[1], 0, 1, 0)
                 glTranslatef(-self.player.pos[0], -self.player.pos[1], -self.player.pos[2])
-                self.world.draw()
-                self.hr_npc.draw()
-                self.ceo_npc.draw()
+                frustum = Frustum.from_gl()
+                with self.profiler.scope("world"):
+                    self.world.draw(frustum)
+                with self.profiler.scope("npcs"):
+                    for npc in self.npcs:
+                        npc.draw(frustum, frustum.eye)
+                    if self.crowd:
+                        self.crowd.draw(frustum)
                 glPopMatrix()
-                self.dialogue.render()
-                pygame.display.flip()
-                pygame.time.Clock().tick(FPS)
+                with self.profiler.scope("dialogue"):
+                    self.dialogue.render()
+                with self.profiler.scope("overlay"):
+                    self.profiler.render_overlay()
+                # GL calls are queued asynchronously, so stalls on earlier stages tend to land here
+                with self.profiler.scope("flip"):
+                    pygame.display.flip()
+                # With vsync the swap already paces frames; the cap only guards against drivers that ignore it
+                self.clock.tick(FPS * 2 if VSYNC else FPS)
         pygame.quit()
 
 # Create and run game
 if __name__ == "__main__":
-    game = Game3D()
-    game.run()
\ No newline at end of file
+    backend = create_backend()
+    # Open pooled connections in the background while the menu is showing
+    backend.warm_up()
+    screen = init_display()
+    init_gl()
+    game = Game3D(screen, backend)
+    game.run()
@@ -3,6 +3,7 @@ import time
 from OpenGL.GL import *
 from OpenGL.GLU import *
 from config import *
+from render_state import gl_state
 
 class MenuScreen:
     def __init__(self, screen):
@@ -12,57 +13,101 @@ class MenuScreen:
         self.font_small = pygame.font.Font(None, 36)
         self.active = True
         self.start_time = time.time()
-
-    def render(self):
-        glClear(GL_COLOR_BUFFER_BIT | GL_DEPTH_BUFFER_BIT)
-        surface = pygame.Surface((WINDOW_WIDTH, WINDOW_HEIGHT), pygame.SRCALPHA)
         center_y = WINDOW_HEIGHT // 2
-        title_y = center_y - 100
-        subtitle_y = center_y - 20
-        prompt_y = center_y + 100
+        self.title_y = center_y - 100
+        self.subtitle_y = center_y - 20
+        self.prompt_y = center_y + 100
+        self.title_reveal_time = len(TITLE) / 15
+        # Static layers are rendered once; only the regions they occupy are re-uploaded
+        self.scanlines = pygame.Surface((WINDOW_WIDTH, WINDOW_HEIGHT), pygame.SRCALPHA)
+        for y in range(0, WINDOW_HEIGHT, 4):
+            pygame.draw.line(self.scanlines, (0, 50, 0), (0, y), (WINDOW_WIDTH, y))
+        self.subtitle_surface = self.font_medium.render(SUBTITLE, True, MENU_TEXT_COLOR)
+        self.subtitle_pos = ((WINDOW_WIDTH - self.subtitle_surface.get_width()) // 2, self.subtitle_y)
+        self.prompt_surface = self.font_small.render("Press ENTER to start", True, MENU_TEXT_COLOR)
+        self.prompt_pos = ((WINDOW_WIDTH - self.prompt_surface.get_width()) // 2, self.prompt_y)
+        self.title_surface = None
+        self.title_rect = pygame.Rect(0, self.title_y, WINDOW_WIDTH, self.font_large.get_linesize())
+        self.subtitle_rect = self.subtitle_surface.get_rect(topleft=self.subtitle_pos)
+        self.prompt_rect = self.prompt_surface.get_rect(topleft=self.prompt_pos)
+        self.surface = pygame.Surface((WINDOW_WIDTH, WINDOW_HEIGHT), pygame.SRCALPHA)
+        self.title_chars = 0
+        self.subtitle_alpha = 0
+        self.prompt_visible = False
+        self.texture = glGenTextures(1)
+        gl_state.bind_texture(GL_TEXTURE_2D, self.texture)
+        glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_MIN_FILTER, GL_LINEAR)
+        glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_MAG_FILTER, GL_LINEAR)
+        glTexImage2D(GL_TEXTURE_2D, 0, GL_RGBA, WINDOW_WIDTH, WINDOW_HEIGHT, 0, GL_RGBA, GL_UNSIGNED_BYTE, None)
+        self.dirty_rects = [self.surface.get_rect()]
+
+    def update_state(self):
         elapsed_time = time.time() - self.start_time
         title_chars = int(min(len(TITLE), elapsed_time * 15))
-        partial_title = TITLE[:title_chars]
-        title_surface = self.font_large.render(partial_title, True, MENU_TEXT_COLOR)
-        title_x = (WINDOW_WIDTH - title_surface.get_width()) // 2
-        surface.blit(title_surface, (title_x, title_y))
-        if elapsed_time > len(TITLE) / 15:
-            subtitle_alpha = min(255, int((elapsed_time - len(TITLE) / 15) * 255))
-            subtitle_surface = self.font_medium.render(SUBTITLE, True, MENU_TEXT_COLOR)
-            subtitle_surface.set_alpha(subtitle_alpha)
-            subtitle_x = (WINDOW_WIDTH - subtitle_surface.get_width()) // 2
-            surface.blit(subtitle_surface, (subtitle_x, subtitle_y))
-        if elapsed_time > (len(TITLE) / 15 + 1):
-            if int(elapsed_time * 2) % 2:
-                prompt_text = "Press ENTER to start"
-                prompt_surface = self.font_small.render(prompt_text, True, MENU_TEXT_COLOR)
-                prompt_x = (WINDOW_WIDTH - prompt_surface.get_width()) // 2
-                surface.blit(prompt_surface, (prompt_x, prompt_y))
-        for y in range(0, WINDOW_HEIGHT, 4):
-            pygame.draw.line(surface, (0, 50, 0), (0, y), (WINDOW_WIDTH, y))
-        texture_data = pygame.image.tostring(surface, "RGBA", True)
-        glMatrixMode(GL_PROJECTION)
+        if title_chars != self.title_chars or self.title_surface is None:
+            self.title_chars = title_chars
+            self.title_surface = self.font_large.render(TITLE[:title_chars], True, MENU_TEXT_COLOR)
+            self.dirty_rects.append(self.title_rect)
+        subtitle_alpha = 0
+        if elapsed_time > self.title_reveal_time:
+            subtitle_alpha = min(255, int((elapsed_time - self.title_reveal_time) * 255))
+        if subtitle_alpha != self.subtitle_alpha:
+            self.subtitle_alpha = subtitle_alpha
+            self.dirty_rects.append(self.subtitle_rect)
+        prompt_visible = elapsed_time > (self.title_reveal_time + 1) and int(elapsed_time * 2) % 2 == 1
+        if prompt_visible != self.prompt_visible:
+            self.prompt_visible = prompt_visible
+            self.dirty_rects.append(self.prompt_rect)
+
+    def compose(self, rect):
+        self.surface.set_clip(rect)
+        self.surface.fill((0, 0, 0, 0))
+        title_x = (WINDOW_WIDTH - self.title_surface.get_width()) // 2
+        self.surface.blit(self.title_surface, (title_x, self.title_y))
+        if self.subtitle_alpha > 0:
+            self.subtitle_surface.set_alpha(self.subtitle_alpha)
+            self.surface.blit(self.subtitle_surface, self.subtitle_pos)
+        if self.prompt_visible:
+            self.surface.blit(self.prompt_surface, self.prompt_pos)
+        self.surface.blit(self.scanlines, (0, 0))
+        self.surface.set_clip(None)
+
+    def upload(self, rect):
+        texture_data = pygame.image.tostring(self.surface.subsurface(rect), "RGBA", True)
+        glTexSubImage2D(GL_TEXTURE_2D, 0, rect.x, WINDOW_HEIGHT - rect.bottom,
+                        rect.width, rect.height, GL_RGBA, GL_UNSIGNED_BYTE, texture_data)
+
+    def release(self):
+        if self.texture is not None:
+            glDeleteTextures(1, [self.texture])
+            gl_state.forget_texture(self.texture)
+            self.texture = None
+
+    def render(self):
+        glClear(GL_COLOR_BUFFER_BIT | GL_DEPTH_BUFFER_BIT)
+        self.update_state()
+        gl_state.bind_texture(GL_TEXTURE_2D, self.texture)
+        for rect in self.dirty_rects:
+            self.compose(rect)
+            self.upload(rect)
+        self.dirty_rects = []
+        gl_state.matrix_mode(GL_PROJECTION)
         glLoadIdentity()
         glOrtho(0, WINDOW_WIDTH, WINDOW_HEIGHT, 0, -1, 1)
-        glMatrixMode(GL_MODELVIEW)
+        gl_state.matrix_mode(GL_MODELVIEW)
         glLoadIdentity()
-        texture = glGenTextures(1)
-        glBindTexture(GL_TEXTURE_2D, texture)
-        glTexImage2D(GL_TEXTURE_2D, 0, GL_RGBA, WINDOW_WIDTH, WINDOW_HEIGHT, 0, GL_RGBA, GL_UNSIGNED_BYTE, texture_data)
-        glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_MIN_FILTER, GL_LINEAR)
-        glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_MAG_FILTER, GL_LINEAR)
-        glEnable(GL_TEXTURE_2D)
+        gl_state.enable(GL_TEXTURE_2D)
         glBegin(GL_QUADS)
         glTexCoord2f(0, 1); glVertex2f(0, 0)
         glTexCoord2f(1, 1); glVertex2f(WINDOW_WIDTH, 0)
         glTexCoord2f(1, 0); glVertex2f(WINDOW_WIDTH, WINDOW_HEIGHT)
         glTexCoord2f(0, 0); glVertex2f(0, WINDOW_HEIGHT)
         glEnd()
-        glDisable(GL_TEXTURE_2D)
-        glMatrixMode(GL_PROJECTION)
+        gl_state.disable(GL_TEXTURE_2D)
+        gl_state.matrix_mode(GL_PROJECTION)
         glLoadIdentity()
-        gluPerspective(45, (WINDOW_WIDTH / WINDOW_HEIGHT), 0.1, 50.0)
-        glMatrixMode(GL_MODELVIEW)
+        gluPerspective(FIELD_OF_VIEW, (WINDOW_WIDTH / WINDOW_HEIGHT), 0.1, 50.0)
+        gl_state.matrix_mode(GL_MODELVIEW)
         glLoadIdentity()
-        glEnable(GL_DEPTH_TEST)
-        pygame.display.flip()
\ No newline at end of file
+        gl_state.enable(GL_DEPTH_TEST)
+        pygame.display.flip()
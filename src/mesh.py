@@ -0,0 +1,112 @@
+import ctypes
+import numpy as np
+from OpenGL.GL import *
+
+FLOAT_SIZE = 4
+VERTEX_STRIDE = 6 * FLOAT_SIZE
+
+class Mesh:
+    def __init__(self, vertices, normals, indices=None, mode=GL_TRIANGLES):
+        # Positions and normals are interleaved so each vertex is one 24-byte record
+        self.data = np.ascontiguousarray(np.hstack((vertices, normals)), dtype=np.float32)
+        self.indices = None if indices is None else np.ascontiguousarray(indices, dtype=np.uint32)
+        self.mode = mode
+        self.vertex_count = len(self.data)
+        self.vertex_buffer = None
+        self.index_buffer = None
+
+    def upload(self):
+        self.vertex_buffer = glGenBuffers(1)
+        glBindBuffer(GL_ARRAY_BUFFER, self.vertex_buffer)
+        glBufferData(GL_ARRAY_BUFFER, self.data.nbytes, self.data, GL_STATIC_DRAW)
+        glBindBuffer(GL_ARRAY_BUFFER, 0)
+        if self.indices is not None:
+            self.index_buffer = glGenBuffers(1)
+            glBindBuffer(GL_ELEMENT_ARRAY_BUFFER, self.index_buffer)
+            glBufferData(GL_ELEMENT_ARRAY_BUFFER, self.indices.nbytes, self.indices, GL_STATIC_DRAW)
+            glBindBuffer(GL_ELEMENT_ARRAY_BUFFER, 0)
+
+    def draw(self):
+        if self.vertex_buffer is None:
+            self.upload()
+        glBindBuffer(GL_ARRAY_BUFFER, self.vertex_buffer)
+        glEnableClientState(GL_VERTEX_ARRAY)
+        glEnableClientState(GL_NORMAL_ARRAY)
+        glVertexPointer(3, GL_FLOAT, VERTEX_STRIDE, None)
+        glNormalPointer(GL_FLOAT, VERTEX_STRIDE, ctypes.c_void_p(3 * FLOAT_SIZE))
+        if self.index_buffer is not None:
+            glBindBuffer(GL_ELEMENT_ARRAY_BUFFER, self.index_buffer)
+            glDrawElements(self.mode, len(self.indices), GL_UNSIGNED_INT, None)
+            glBindBuffer(GL_ELEMENT_ARRAY_BUFFER, 0)
+        else:
+            glDrawArrays(self.mode, 0, self.vertex_count)
+        glDisableClientState(GL_NORMAL_ARRAY)
+        glDisableClientState(GL_VERTEX_ARRAY)
+        glBindBuffer(GL_ARRAY_BUFFER, 0)
+
+    def release(self):
+        if self.vertex_buffer is not None:
+            glDeleteBuffers(1, [self.vertex_buffer])
+            self.vertex_buffer = None
+        if self.index_buffer is not None:
+            glDeleteBuffers(1, [self.index_buffer])
+            self.index_buffer = None
+
+def build_sphere(radius, slices, stacks):
+    lat = np.pi * (-0.5 + np.arange(stacks + 1) / stacks)
+    lng = 2 * np.pi * np.arange(slices + 1) / slices
+    z = np.sin(lat)[:, None]
+    zr = np.cos(lat)[:, None]
+    x = np.cos(lng)[None, :]
+    y = np.sin(lng)[None, :]
+    normals = np.stack(np.broadcast_arrays(x * zr, y * zr, z), axis=-1).reshape(-1, 3)
+    vertices = normals * radius
+    row = np.arange(stacks)[:, None] * (slices + 1)
+    col = np.arange(slices)[None, :]
+    a = (row + col).ravel()
+    b = a + slices + 1
+    indices = np.stack((a, b, a + 1, a + 1, b, b + 1), axis=-1).ravel()
+    return Mesh(vertices, normals, indices, GL_TRIANGLES)
+
+def build_cube():
+    corners = np.array([
+        [-0.5, -0.5, 0.5],
+        [0.5, -0.5, 0.5],
+        [0.5, 0.5, 0.5],
+        [-0.5, 0.5, 0.5],
+        [-0.5, -0.5, -0.5],
+        [-0.5, 0.5, -0.5],
+        [0.5, 0.5, -0.5],
+        [0.5, -0.5, -0.5],
+    ])
+    surfaces = np.array([
+        [0, 1, 2, 3],
+        [3, 2, 6, 5],
+        [0, 3, 5, 4],
+        [1, 7, 6, 2],
+        [4, 5, 6, 7],
+        [0, 4, 7, 1],
+    ])
+    vertices = corners[surfaces.ravel()]
+    normals = np.tile([0.0, 0.0, 1.0], (len(vertices), 1))
+    return Mesh(vertices, normals, None, GL_QUADS)
+
+_mesh_cache = {}
+
+def get_sphere_mesh(radius, slices, stacks):
+    key = ('sphere', radius, slices, stacks)
+    mesh = _mesh_cache.get(key)
+    if mesh is None:
+        mesh = _mesh_cache[key] = build_sphere(radius, slices, stacks)
+    return mesh
+
+def get_cube_mesh():
+    mesh = _mesh_cache.get('cube')
+    if mesh is None:
+        mesh = _mesh_cache['cube'] = build_cube()
+    return mesh
+
+def clear_mesh_cache():
+    for mesh in _mesh_cache.values():
+        mesh.release()
+    _mesh_cache.clear()
@@ -1,5 +1,23 @@
+import math
 from OpenGL.GL import *
 from world import draw_sphere, draw_cube
+from render_state import gl_state
+from config import WINDOW_HEIGHT, FIELD_OF_VIEW, LOD_BIAS
+
+# (minimum on-screen height in pixels, sphere slices/stacks), most detailed first
+NPC_LOD_LEVELS = ((150, 16), (60, 10), (0, 6))
+# Bounding sphere of the scaled body, relative to pos
+NPC_BOUNDS_OFFSET_Y = -0.26
+NPC_BOUNDS_RADIUS = 0.45
+# Pixels per world unit at distance 1 for the fixed perspective projection
+PIXELS_PER_UNIT = WINDOW_HEIGHT / (2 * math.tan(math.radians(FIELD_OF_VIEW) / 2))
+
+def select_lod(distance, radius=NPC_BOUNDS_RADIUS, bias=LOD_BIAS):
+    size = 2 * radius * PIXELS_PER_UNIT / max(distance, 1e-3) * bias
+    for min_pixels, detail in NPC_LOD_LEVELS:
+        if size >= min_pixels:
+            return detail
+    return NPC_LOD_LEVELS[-1][1]
 
 class NPC:
     def __init__(self, x, y, z, role="HR"):
@@ -16,24 +34,36 @@ class NPC:
             self.clothes_primary = (0.2, 0.3, 0.8)
             self.clothes_secondary = (0.15, 0.2, 0.6)
 
-    def draw(self):
+    def bounds_center(self):
+        return (self.pos[0], self.pos[1] + NPC_BOUNDS_OFFSET_Y, self.pos[2])
+
+    def draw(self, frustum=None, camera=None):
+        center = self.bounds_center()
+        if frustum is not None and not frustum.contains_sphere(center, NPC_BOUNDS_RADIUS):
+            return False
+        detail = NPC_LOD_LEVELS[0][1]
+        if camera is not None:
+            dx = center[0] - camera[0]
+            dy = center[1] - camera[1]
+            dz = center[2] - camera[2]
+            detail = select_lod(math.sqrt(dx * dx + dy * dy + dz * dz))
         glPushMatrix()
         glTranslatef(self.pos[0], self.pos[1], self.pos[2])
         glScalef(self.scale, self.scale, self.scale)
-        glColor3f(*self.skin_color)
-        draw_sphere(0.12, 16, 16)
-        glColor3f(*self.hair_color)
+        gl_state.color(*self.skin_color)
+        draw_sphere(0.12, detail, detail)
+        gl_state.color(*self.hair_color)
         glPushMatrix()
         glTranslatef(0, 0.05, 0)
-        draw_sphere(0.13, 16, 16)
+        draw_sphere(0.13, detail, detail)
         glPopMatrix()
-        glColor3f(*self.clothes_primary)
+        gl_state.color(*self.clothes_primary)
         glPushMatrix()
         glTranslatef(0, -0.3, 0)
         glScalef(0.3, 0.4, 0.2)
         draw_cube()
         glPopMatrix()
-        glColor3f(*self.clothes_secondary)
+        gl_state.color(*self.clothes_secondary)
         for x_offset in [-0.2, 0.2]:
             glPushMatrix()
             glTranslatef(x_offset, -0.3, 0)
@@ -46,4 +76,5 @@ class NPC:
             glScalef(0.1, 0.5, 0.1)
             draw_cube()
             glPopMatrix()
-        glPopMatrix()
\ No newline at end of file
+        glPopMatrix()
+        return True
@@ -0,0 +1,51 @@
+import threading
+import time
+import httpx
+from openai import OpenAI
+
+HTTP_MAX_CONNECTIONS = 10
+HTTP_MAX_KEEPALIVE_CONNECTIONS = 5
+HTTP_KEEPALIVE_EXPIRY = 120.0
+CONNECT_TIMEOUT = 5.0
+MAX_RETRIES = 2
+WARMUP_CONNECTIONS = 2
+
+# Read timeouts per endpoint; streaming calls apply them per chunk, not to the whole response
+ENDPOINT_TIMEOUTS = {
+    "chat": 20.0,
+    "summary": 30.0,
+    "tts": 20.0,
+    "stt": 20.0,
+    "warmup": 10.0,
+}
+
+def request_timeout(endpoint):
+    return httpx.Timeout(ENDPOINT_TIMEOUTS[endpoint], connect=CONNECT_TIMEOUT)
+
+def create_client(api_key, max_connections=HTTP_MAX_CONNECTIONS, max_keepalive_connections=HTTP_MAX_KEEPALIVE_CONNECTIONS,
+                  keepalive_expiry=HTTP_KEEPALIVE_EXPIRY, max_retries=MAX_RETRIES):
+    http_client = httpx.Client(
+        limits=httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive_connections,
+            keepalive_expiry=keepalive_expiry,
+        ),
+        timeout=request_timeout("chat"),
+    )
+    # The SDK retries connection errors, 408/409/429 and 5xx with exponential backoff plus jitter
+    return OpenAI(api_key=api_key, http_client=http_client, max_retries=max_retries)
+
+def warm_up(client, connections=WARMUP_CONNECTIONS):
+    def open_connection(index):
+        start_time = time.time()
+        try:
+            client.with_options(timeout=request_timeout("warmup"), max_retries=0).models.list()
+            print(f"[OpenAI] Connection {index} warmed up in {(time.time() - start_time) * 1000:.0f} ms")
+        except Exception as e:
+            print(f"[OpenAI] Connection warm-up failed: {e}")
+
+    # Run concurrently so the pool ends up holding several open keep-alive connections
+    threads = [threading.Thread(target=open_connection, args=(i,), daemon=True) for i in range(connections)]
+    for thread in threads:
+        thread.start()
+    return threads
@@ -1,23 +1,24 @@
 import math
 
 class Player:
-    def __init__(self):
+    def __init__(self, collision=None):
         self.pos = [0, 0.5, 0]
         self.rot = [0, 0, 0]
-        self.speed = 0.3
+        # World units per second; the original per-frame step of 0.3 at 60 FPS
+        self.speed = 18.0
         self.mouse_sensitivity = 0.5
+        self.collision = collision
 
-    def move(self, dx, dz):
+    def move(self, dx, dz, dt):
         angle = math.radians(-self.rot[1])
-        move_x = (dx * math.cos(angle) + dz * math.sin(angle)) * self.speed
-        move_z = (-dx * math.sin(angle) + dz * math.cos(angle)) * self.speed
-        new_x = self.pos[0] + move_x
-        new_z = self.pos[2] + move_z
-        room_limit = 4.5
-        if abs(new_x) < room_limit:
-            self.pos[0] = new_x
-        if abs(new_z) < room_limit:
-            self.pos[2] = new_z
+        step = self.speed * dt
+        move_x = (dx * math.cos(angle) + dz * math.sin(angle)) * step
+        move_z = (-dx * math.sin(angle) + dz * math.cos(angle)) * step
+        if self.collision:
+            self.pos[0], self.pos[2] = self.collision.sweep(self.pos[0], self.pos[2], move_x, move_z)
+        else:
+            self.pos[0] += move_x
+            self.pos[2] += move_z
 
     def update_rotation(self, dx, dy):
         self.rot[1] += dx * self.mouse_sensitivity
\ No newline at end of file
@@ -0,0 +1,168 @@
+import json
+import time
+from contextlib import contextmanager
+import numpy as np
+import pygame
+from OpenGL.GL import *
+from render_state import gl_state
+from config import WINDOW_WIDTH, WINDOW_HEIGHT, PROFILER_FRAMES, PROFILER_OVERLAY_REFRESH_S
+
+PROFILER_STAGES = ("events", "interaction", "world", "npcs", "dialogue", "overlay", "flip")
+OVERLAY_WIDTH = 300
+OVERLAY_MARGIN = 10
+OVERLAY_BAR_MS = 16.7
+
+class FrameProfiler:
+    def __init__(self, stages=PROFILER_STAGES, capacity=PROFILER_FRAMES):
+        self.stages = list(stages)
+        self.stage_index = {name: i for i, name in enumerate(self.stages)}
+        self.capacity = capacity
+        # One row per frame: stage times followed by the full frame interval, all in ms
+        self.samples = np.zeros((capacity, len(self.stages) + 1), dtype=np.float32)
+        self.frame_count = 0
+        self.frame_start = None
+        self.row = np.zeros(len(self.stages) + 1, dtype=np.float32)
+        self.overlay_visible = False
+        self.overlay_texture = None
+        self.overlay_size = (0, 0)
+        self.overlay_updated = 0
+        self.font = None
+
+    def begin_frame(self):
+        now = time.perf_counter()
+        if self.frame_start is not None:
+            # The interval includes the frame limiter's sleep, so it reflects the real frame rate
+            self.row[-1] = (now - self.frame_start) * 1000
+            self.samples[self.frame_count % self.capacity] = self.row
+            self.frame_count += 1
+        self.frame_start = now
+        self.row[:] = 0
+
+    @contextmanager
+    def scope(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.row[self.stage_index[name]] += (time.perf_counter() - start) * 1000
+
+    def recent(self):
+        count = min(self.frame_count, self.capacity)
+        if self.frame_count <= self.capacity:
+            return self.samples[:count]
+        start = self.frame_count % self.capacity
+        return np.concatenate((self.samples[start:], self.samples[:start]))
+
+    def get_stats(self):
+        samples = self.recent()
+        if not len(samples):
+            return {"frames": 0, "fps": 0.0, "frame": {}, "stages": {}}
+
+        def describe(column):
+            return {
+                "mean_ms": round(float(column.mean()), 3),
+                "p95_ms": round(float(np.percentile(column, 95)), 3),
+                "max_ms": round(float(column.max()), 3),
+            }
+
+        frame = samples[:, -1]
+        return {
+            "frames": len(samples),
+            "fps": round(1000.0 / float(frame.mean()), 1) if frame.mean() > 0 else 0.0,
+            "frame": describe(frame),
+            "stages": {name: describe(samples[:, i]) for i, name in enumerate(self.stages)},
+        }
+
+    def dump(self, path=None):
+        path = path or time.strftime("profile_%Y%m%d_%H%M%S.json")
+        samples = self.recent()
+        report = {
+            "stages": self.stages,
+            "stats": self.get_stats(),
+            "samples_ms": [dict(zip(self.stages + ["frame"], map(float, row))) for row in samples],
+        }
+        with open(path, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"[Profiler] Dumped {len(samples)} frames to {path}")
+        return path
+
+    def toggle_overlay(self):
+        self.overlay_visible = not self.overlay_visible
+        self.overlay_updated = 0
+
+    def compose_overlay(self):
+        if self.font is None:
+            pygame.font.init()
+            self.font = pygame.font.Font(None, 20)
+        stats = self.get_stats()
+        line_height = self.font.get_linesize()
+        surface = pygame.Surface((OVERLAY_WIDTH, line_height * (len(self.stages) + 2) + 8), pygame.SRCALPHA)
+        surface.fill((0, 0, 0, 170))
+        frame_ms = stats["frame"].get("mean_ms", 0.0)
+        header = f"{stats['fps']:.0f} FPS  frame {frame_ms:.2f} ms"
+        surface.blit(self.font.render(header, True, (255, 255, 255)), (6, 4))
+        for i, name in enumerate(self.stages):
+            stage = stats["stages"].get(name, {"mean_ms": 0.0, "max_ms": 0.0})
+            y = 4 + line_height * (i + 1)
+            bar = int(min(1.0, stage["mean_ms"] / OVERLAY_BAR_MS) * (OVERLAY_WIDTH - 200))
+            pygame.draw.rect(surface, (0, 200, 0, 200), (190, y + 3, max(1, bar), line_height - 6))
+            timing = f"{stage['mean_ms']:.2f} / {stage['max_ms']:.2f}"
+            surface.blit(self.font.render(name, True, (200, 255, 200)), (6, y))
+            surface.blit(self.font.render(timing, True, (200, 255, 200)), (90, y))
+        return surface
+
+    def upload_overlay(self):
+        surface = self.compose_overlay()
+        data = pygame.image.tostring(surface, "RGBA", True)
+        if self.overlay_texture is None:
+            self.overlay_texture = glGenTextures(1)
+        gl_state.bind_texture(GL_TEXTURE_2D, self.overlay_texture)
+        glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_MIN_FILTER, GL_LINEAR)
+        glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_MAG_FILTER, GL_LINEAR)
+        glTexImage2D(GL_TEXTURE_2D, 0, GL_RGBA, surface.get_width(), surface.get_height(), 0, GL_RGBA, GL_UNSIGNED_BYTE, data)
+        self.overlay_size = surface.get_size()
+
+    def render_overlay(self):
+        if not self.overlay_visible:
+            return
+        now = time.time()
+        # Re-rendering the text every frame would show up in the numbers it reports
+        if now - self.overlay_updated > PROFILER_OVERLAY_REFRESH_S:
+            self.upload_overlay()
+            self.overlay_updated = now
+        width, height = self.overlay_size
+        x0 = OVERLAY_MARGIN
+        y0 = WINDOW_HEIGHT - OVERLAY_MARGIN - height
+        gl_state.matrix_mode(GL_PROJECTION)
+        glPushMatrix()
+        glLoadIdentity()
+        glOrtho(0, WINDOW_WIDTH, 0, WINDOW_HEIGHT, -1, 1)
+        gl_state.matrix_mode(GL_MODELVIEW)
+        glPushMatrix()
+        glLoadIdentity()
+        gl_state.disable(GL_DEPTH_TEST)
+        gl_state.disable(GL_LIGHTING)
+        gl_state.enable(GL_BLEND)
+        gl_state.blend_func(GL_SRC_ALPHA, GL_ONE_MINUS_SRC_ALPHA)
+        gl_state.enable(GL_TEXTURE_2D)
+        gl_state.bind_texture(GL_TEXTURE_2D, self.overlay_texture)
+        gl_state.color(1, 1, 1, 1)
+        glBegin(GL_QUADS)
+        glTexCoord2f(0, 0); glVertex2f(x0, y0)
+        glTexCoord2f(1, 0); glVertex2f(x0 + width, y0)
+        glTexCoord2f(1, 1); glVertex2f(x0 + width, y0 + height)
+        glTexCoord2f(0, 1); glVertex2f(x0, y0 + height)
+        glEnd()
+        gl_state.matrix_mode(GL_PROJECTION)
+        glPopMatrix()
+        gl_state.matrix_mode(GL_MODELVIEW)
+        glPopMatrix()
+        gl_state.disable(GL_TEXTURE_2D)
+        gl_state.enable(GL_LIGHTING)
+        gl_state.enable(GL_DEPTH_TEST)
+
+    def release(self):
+        if self.overlay_texture is not None:
+            glDeleteTextures([self.overlay_texture])
+            gl_state.forget_texture(self.overlay_texture)
+            self.overlay_texture = None
@@ -0,0 +1,95 @@
+from OpenGL.GL import *
+
+class RenderState:
+    # Shadow copy of the fixed-function state we touch; a call is only issued when the value actually changes.
+    # Anything unknown (None) is always issued, so invalidating after foreign GL code is always safe.
+    def __init__(self):
+        self.caps = {}
+        self.textures = {}
+        self.blend = None
+        self.color_material_mode = None
+        self.mode = None
+        self.current_color = None
+        self.issued = 0
+        self.avoided = 0
+
+    def set_enabled(self, cap, enabled):
+        if self.caps.get(cap) == enabled:
+            self.avoided += 1
+            return
+        if enabled:
+            glEnable(cap)
+        else:
+            glDisable(cap)
+        self.caps[cap] = enabled
+        self.issued += 1
+
+    def enable(self, cap):
+        self.set_enabled(cap, True)
+
+    def disable(self, cap):
+        self.set_enabled(cap, False)
+
+    def bind_texture(self, target, texture):
+        if self.textures.get(target) == texture:
+            self.avoided += 1
+            return
+        glBindTexture(target, texture)
+        self.textures[target] = texture
+        self.issued += 1
+
+    def blend_func(self, src, dst):
+        if self.blend == (src, dst):
+            self.avoided += 1
+            return
+        glBlendFunc(src, dst)
+        self.blend = (src, dst)
+        self.issued += 1
+
+    def color_material(self, face, mode):
+        if self.color_material_mode == (face, mode):
+            self.avoided += 1
+            return
+        glColorMaterial(face, mode)
+        self.color_material_mode = (face, mode)
+        self.issued += 1
+
+    def matrix_mode(self, mode):
+        if self.mode == mode:
+            self.avoided += 1
+            return
+        glMatrixMode(mode)
+        self.mode = mode
+        self.issued += 1
+
+    def color(self, r, g, b, a=1.0):
+        color = (r, g, b, a)
+        if self.current_color == color:
+            self.avoided += 1
+            return
+        glColor4f(r, g, b, a)
+        self.current_color = color
+        self.issued += 1
+
+    def invalidate_color(self):
+        # Display lists and colour arrays change the current colour behind our back
+        self.current_color = None
+
+    def forget_texture(self, texture):
+        # Deleting a bound texture reverts the binding to 0
+        for target, bound in list(self.textures.items()):
+            if bound == texture:
+                self.textures[target] = 0
+
+    def invalidate(self):
+        self.caps.clear()
+        self.textures.clear()
+        self.blend = None
+        self.color_material_mode = None
+        self.mode = None
+        self.current_color = None
+
+    def get_stats(self):
+        return {"issued": self.issued, "avoided": self.avoided}
+
+gl_state = RenderState()
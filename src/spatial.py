@@ -0,0 +1,79 @@
+import math
+
+class NPCRegistry:
+    # Uniform grid over the map footprint; cells are at least the query radius wide so a lookup touches 3x3 cells
+    def __init__(self, cell_size, width, depth, origin=(0.0, 0.0)):
+        self.cell_size = cell_size
+        self.origin = origin
+        self.cols = max(1, math.ceil(width / cell_size))
+        self.rows = max(1, math.ceil(depth / cell_size))
+        self.cells = [[] for _ in range(self.cols * self.rows)]
+        self.cell_of = {}
+        self.roles = {}
+
+    @classmethod
+    def from_level(cls, level, radius):
+        # Whole tiles per cell keeps cell borders on tile borders
+        cell_size = math.ceil(radius / level.tile_size) * level.tile_size
+        return cls(cell_size, level.width, level.depth, origin=level.origin)
+
+    def __len__(self):
+        return len(self.cell_of)
+
+    def __iter__(self):
+        return iter(self.cell_of)
+
+    def cell_coords(self, x, z):
+        # Positions outside the map clamp to the border cells, which keeps queries near the edge correct
+        cx = min(self.cols - 1, max(0, int((x - self.origin[0]) // self.cell_size)))
+        cz = min(self.rows - 1, max(0, int((z - self.origin[1]) // self.cell_size)))
+        return cx, cz
+
+    def cell_index(self, x, z):
+        cx, cz = self.cell_coords(x, z)
+        return cz * self.cols + cx
+
+    def add(self, npc):
+        index = self.cell_index(npc.pos[0], npc.pos[2])
+        self.cells[index].append(npc)
+        self.cell_of[npc] = index
+        self.roles.setdefault(npc.role, []).append(npc)
+
+    def remove(self, npc):
+        self.cells[self.cell_of.pop(npc)].remove(npc)
+        self.roles[npc.role].remove(npc)
+
+    def move(self, npc, x, z):
+        npc.pos[0] = x
+        npc.pos[2] = z
+        index = self.cell_index(x, z)
+        old_index = self.cell_of[npc]
+        if index != old_index:
+            self.cells[old_index].remove(npc)
+            self.cells[index].append(npc)
+            self.cell_of[npc] = index
+
+    def by_role(self, role):
+        npcs = self.roles.get(role)
+        return npcs[0] if npcs else None
+
+    def within(self, x, z, radius):
+        # Cells touched by the query square; 3x3 whenever radius <= cell_size
+        min_cx, min_cz = self.cell_coords(x - radius, z - radius)
+        max_cx, max_cz = self.cell_coords(x + radius, z + radius)
+        radius_sq = radius * radius
+        found = []
+        for cz in range(min_cz, max_cz + 1):
+            row = cz * self.cols
+            for cx in range(min_cx, max_cx + 1):
+                for npc in self.cells[row + cx]:
+                    dx = npc.pos[0] - x
+                    dz = npc.pos[2] - z
+                    distance_sq = dx * dx + dz * dz
+                    if distance_sq < radius_sq:
+                        found.append((distance_sq, npc))
+        return found
+
+    def nearest(self, x, z, radius):
+        found = self.within(x, z, radius)
+        return min(found, key=lambda item: item[0])[1] if found else None
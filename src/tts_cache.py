@@ -0,0 +1,108 @@
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+import numpy as np
+
+TTS_CACHE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "vbaigame", "tts")
+TTS_CACHE_MAX_BYTES = 200 * 1024 * 1024
+TTS_CACHE_MEMORY_ENTRIES = 64
+
+class TTSCache:
+    def __init__(self, cache_dir=TTS_CACHE_DIR, max_bytes=TTS_CACHE_MAX_BYTES, max_memory_entries=TTS_CACHE_MEMORY_ENTRIES):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.max_memory_entries = max_memory_entries
+        self.lock = threading.Lock()
+        # Both maps are kept in least-recently-used-first order
+        self.memory = OrderedDict()
+        self.index = OrderedDict()
+        self.total_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        os.makedirs(self.cache_dir, exist_ok=True)
+        entries = []
+        for name in os.listdir(self.cache_dir):
+            if name.endswith(".pcm"):
+                stat = os.stat(os.path.join(self.cache_dir, name))
+                entries.append((stat.st_mtime, name[:-4], stat.st_size))
+        for _, key, size in sorted(entries):
+            self.index[key] = size
+            self.total_bytes += size
+        print(f"[TTSCache] {len(self.index)} cached clips, {self.total_bytes / (1024 * 1024):.1f} MB in {self.cache_dir}")
+
+    @staticmethod
+    def make_key(model, voice, text):
+        return hashlib.sha256(f"{model}\0{voice}\0{text}".encode("utf-8")).hexdigest()
+
+    def path(self, key):
+        return os.path.join(self.cache_dir, key + ".pcm")
+
+    def contains(self, model, voice, text):
+        with self.lock:
+            return self.make_key(model, voice, text) in self.index
+
+    def get(self, model, voice, text):
+        key = self.make_key(model, voice, text)
+        with self.lock:
+            audio = self.memory.get(key)
+            if audio is not None:
+                self.memory.move_to_end(key)
+                self.index.move_to_end(key)
+                self.hits += 1
+                return audio
+            if key not in self.index:
+                self.misses += 1
+                return None
+            self.index.move_to_end(key)
+        try:
+            audio = np.memmap(self.path(key), dtype=np.int16, mode="r")
+            os.utime(self.path(key))
+        except (OSError, ValueError) as e:
+            print(f"[TTSCache] Dropping unreadable entry {key}: {e}")
+            with self.lock:
+                self.total_bytes -= self.index.pop(key, 0)
+                self.misses += 1
+            return None
+        with self.lock:
+            self.memory[key] = audio
+            while len(self.memory) > self.max_memory_entries:
+                self.memory.popitem(last=False)
+            self.hits += 1
+        return audio
+
+    def put(self, model, voice, text, data):
+        if not data:
+            return
+        key = self.make_key(model, voice, text)
+        path = self.path(key)
+        temp_path = f"{path}.{threading.get_ident()}.tmp"
+        try:
+            with open(temp_path, "wb") as f:
+                f.write(data)
+            os.replace(temp_path, path)
+        except OSError as e:
+            print(f"[TTSCache] Failed to store clip: {e}")
+            return
+        with self.lock:
+            self.total_bytes += len(data) - self.index.pop(key, 0)
+            self.index[key] = len(data)
+            self.memory.pop(key, None)
+            while self.total_bytes > self.max_bytes and len(self.index) > 1:
+                old_key, size = self.index.popitem(last=False)
+                self.memory.pop(old_key, None)
+                self.total_bytes -= size
+                try:
+                    os.remove(self.path(old_key))
+                except OSError:
+                    pass
+
+    def get_stats(self):
+        with self.lock:
+            return {
+                "entries": len(self.index),
+                "bytes": self.total_bytes,
+                "memory_entries": len(self.memory),
+                "hits": self.hits,
+                "misses": self.misses,
+            }
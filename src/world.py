@@ -1,55 +1,37 @@
 from OpenGL.GL import *
 from config import *
+from mesh import get_cube_mesh, get_sphere_mesh
+from level import default_level, load_level, WALL_HEIGHT
+from render_state import gl_state
+import numpy as np
 import math
 
 def draw_cube():
-    vertices = [
-        [-0.5, -0.5, 0.5],
-        [0.5, -0.5, 0.5],
-        [0.5, 0.5, 0.5],
-        [-0.5, 0.5, 0.5],
-        [-0.5, -0.5, -0.5],
-        [-0.5, 0.5, -0.5],
-        [0.5, 0.5, -0.5],
-        [0.5, -0.5, -0.5],
-    ]
-    surfaces = [
-        [0, 1, 2, 3],
-        [3, 2, 6, 5],
-        [0, 3, 5, 4],
-        [1, 7, 6, 2],
-        [4, 5, 6, 7],
-        [0, 4, 7, 1],
-    ]
-    glBegin(GL_QUADS)
-    for surface in surfaces:
-        glNormal3f(0, 0, 1)
-        for vertex in surface:
-            glVertex3fv(vertices[vertex])
-    glEnd()
+    get_cube_mesh().draw()
 
 def draw_sphere(radius, slices, stacks):
-    for i in range(stacks):
-        lat0 = math.pi * (-0.5 + float(i) / stacks)
-        z0 = math.sin(lat0)
-        zr0 = math.cos(lat0)
-        lat1 = math.pi * (-0.5 + float(i + 1) / stacks)
-        z1 = math.sin(lat1)
-        zr1 = math.cos(lat1)
-        glBegin(GL_QUAD_STRIP)
-        for j in range(slices + 1):
-            lng = 2 * math.pi * float(j) / slices
-            x = math.cos(lng)
-            y = math.sin(lng)
-            glNormal3f(x * zr0, y * zr0, z0)
-            glVertex3f(x * zr0 * radius, y * zr0 * radius, z0 * radius)
-            glNormal3f(x * zr1, y * zr1, z1)
-            glVertex3f(x * zr1 * radius, y * zr1 * radius, z1 * radius)
-        glEnd()
+    get_sphere_mesh(radius, slices, stacks).draw()
+
+PLANT_POT_RADIUS = 0.1
+PLANT_POT_HEIGHT = 0.15
+PLANT_POT_SEGMENTS = 8
+PLANT_LEAF_SIZE = 0.15
+PLANT_NUM_LEAVES = 6
+
+# Pot ring and leaf tips are fixed, so the trig is done once at import time
+PLANT_POT_RING = [
+    (math.cos((i / PLANT_POT_SEGMENTS) * 2 * math.pi) * PLANT_POT_RADIUS,
+     math.sin((i / PLANT_POT_SEGMENTS) * 2 * math.pi) * PLANT_POT_RADIUS)
+    for i in range(PLANT_POT_SEGMENTS + 1)
+]
+PLANT_LEAF_TIPS = [
+    (math.cos((i / PLANT_NUM_LEAVES) * 2 * math.pi) * PLANT_LEAF_SIZE,
+     math.sin((i / PLANT_NUM_LEAVES) * 2 * math.pi) * PLANT_LEAF_SIZE)
+    for i in range(PLANT_NUM_LEAVES)
+]
 
 class World:
-    def __init__(self):
-        self.size = 5
+    def __init__(self, level=None):
         self.colors = {
             'floor': (0.76, 0.6, 0.42),
             'walls': (0.85, 0.85, 0.85),
@@ -59,6 +41,72 @@ class World:
             'plant': (0.2, 0.5, 0.2),
             'partition': (0.3, 0.3, 0.3)
         }
+        self.prop_builders = {
+            'desk': self.draw_desk,
+            'chair': self.draw_chair,
+            'partition': self.draw_partition_walls,
+            'plant': self.draw_plant,
+        }
+        self.level = level or default_level()
+        # One display list per chunk, built by compile() once a GL context exists (draw() falls back to it)
+        self.display_lists = []
+        self.visible_chunks = 0
+        self.chunk_mins = None
+        self.chunk_maxs = None
+
+    def load_map(self, path):
+        self.set_level(load_level(path))
+
+    def set_level(self, level):
+        self.invalidate()
+        self.level = level
+
+    def compile(self):
+        if self.display_lists:
+            return
+        for chunk in self.level.chunks:
+            list_id = glGenLists(1)
+            glNewList(list_id, GL_COMPILE)
+            self.draw_chunk(chunk)
+            glEndList()
+            self.display_lists.append(list_id)
+        self.chunk_mins = np.array([chunk.bounds_min for chunk in self.level.chunks])
+        self.chunk_maxs = np.array([chunk.bounds_max for chunk in self.level.chunks])
+        props = sum(len(chunk.props) for chunk in self.level.chunks)
+        print(f"[World] Compiled {len(self.display_lists)} chunks ({props} props)")
+
+    def invalidate(self):
+        for list_id in self.display_lists:
+            glDeleteLists(list_id, 1)
+        self.display_lists = []
+
+    def draw_chunk(self, chunk):
+        if chunk.floor:
+            glBegin(GL_QUADS)
+            glColor3f(*self.colors['floor'])
+            glNormal3f(0, 1, 0)
+            for x0, z0, x1, z1 in chunk.floor:
+                glVertex3f(x0, 0, z0)
+                glVertex3f(x0, 0, z1)
+                glVertex3f(x1, 0, z1)
+                glVertex3f(x1, 0, z0)
+            glEnd()
+        if chunk.walls:
+            glBegin(GL_QUADS)
+            glColor3f(*self.colors['walls'])
+            for x0, z0, x1, z1, nx, nz in chunk.walls:
+                glNormal3f(nx, 0, nz)
+                glVertex3f(x0, 0, z0)
+                glVertex3f(x1, 0, z1)
+                glVertex3f(x1, WALL_HEIGHT, z1)
+                glVertex3f(x0, WALL_HEIGHT, z0)
+            glEnd()
+        for kind, *args in chunk.props:
+            builder = self.prop_builders.get(kind)
+            if builder:
+                builder(*args)
+            else:
+                print(f"[World] Unknown prop type: {kind}")
 
     def draw_desk(self, x, z, rotation=0):
         glPushMatrix()
@@ -118,77 +166,37 @@ class World:
         glPushMatrix()
         glTranslatef(x, 0, z)
         glColor3f(0.4, 0.2, 0.1)
-        pot_radius = 0.1
-        pot_height = 0.15
-        segments = 8
         glBegin(GL_QUADS)
-        for i in range(segments):
-            angle1 = (i / segments) * 2 * math.pi
-            angle2 = ((i + 1) / segments) * 2 * math.pi
-            x1 = math.cos(angle1) * pot_radius
-            z1 = math.sin(angle1) * pot_radius
-            x2 = math.cos(angle2) * pot_radius
-            z2 = math.sin(angle2) * pot_radius
+        for (x1, z1), (x2, z2) in zip(PLANT_POT_RING, PLANT_POT_RING[1:]):
             glVertex3f(x1, 0, z1)
             glVertex3f(x2, 0, z2)
-            glVertex3f(x2, pot_height, z2)
-            glVertex3f(x1, pot_height, z1)
+            glVertex3f(x2, PLANT_POT_HEIGHT, z2)
+            glVertex3f(x1, PLANT_POT_HEIGHT, z1)
         glEnd()
         glColor3f(*self.colors['plant'])
-        glTranslatef(0, pot_height, 0)
-        leaf_size = 0.15
-        num_leaves = 6
-        for i in range(num_leaves):
-            angle = (i / num_leaves) * 2 * math.pi
-            x = math.cos(angle) * leaf_size
-            z = math.sin(angle) * leaf_size
-            glBegin(GL_TRIANGLES)
+        glTranslatef(0, PLANT_POT_HEIGHT, 0)
+        glBegin(GL_TRIANGLES)
+        for x, z in PLANT_LEAF_TIPS:
             glVertex3f(0, 0, 0)
-            glVertex3f(x, leaf_size, z)
-            glVertex3f(z, leaf_size/2, -x)
-            glEnd()
+            glVertex3f(x, PLANT_LEAF_SIZE, z)
+            glVertex3f(z, PLANT_LEAF_SIZE/2, -x)
+        glEnd()
         glPopMatrix()
 
-    def draw(self):
-        glEnable(GL_COLOR_MATERIAL)
-        glColorMaterial(GL_FRONT_AND_BACK, GL_AMBIENT_AND_DIFFUSE)
-        glBegin(GL_QUADS)
-        glColor3f(*self.colors['floor'])
-        glNormal3f(0, 1, 0)
-        glVertex3f(-self.size, 0, -self.size)
-        glVertex3f(-self.size, 0, self.size)
-        glVertex3f(self.size, 0, self.size)
-        glVertex3f(self.size, 0, -self.size)
-        glEnd()
-        glBegin(GL_QUADS)
-        glColor3f(*self.colors['walls'])
-        glVertex3f(-self.size, 0, -self.size)
-        glVertex3f(self.size, 0, -self.size)
-        glVertex3f(self.size, 2, -self.size)
-        glVertex3f(-self.size, 2, -self.size)
-        glVertex3f(-self.size, 0, self.size)
-        glVertex3f(self.size, 0, self.size)
-        glVertex3f(self.size, 2, self.size)
-        glVertex3f(-self.size, 2, self.size)
-        glVertex3f(-self.size, 0, -self.size)
-        glVertex3f(-self.size, 0, self.size)
-        glVertex3f(-self.size, 2, self.size)
-        glVertex3f(-self.size, 2, -self.size)
-        glVertex3f(self.size, 0, -self.size)
-        glVertex3f(self.size, 0, self.size)
-        glVertex3f(self.size, 2, self.size)
-        glVertex3f(self.size, 2, -self.size)
-        glEnd()
-        self.draw_desk(-4, -2, 90)
-        self.draw_chair(-3.5, -2, 90)
-        self.draw_partition_walls(-4, -2)
-        self.draw_desk(4, 1, -90)
-        self.draw_chair(3.5, 1, -90)
-        self.draw_partition_walls(4, 1)
-        self.draw_plant(-4.5, -4.5)
-        self.draw_plant(4.5, -4.5)
-        self.draw_plant(-4.5, 4.5)
-        self.draw_plant(4.5, 4.5)
+    def draw(self, frustum=None):
+        gl_state.enable(GL_COLOR_MATERIAL)
+        gl_state.color_material(GL_FRONT_AND_BACK, GL_AMBIENT_AND_DIFFUSE)
+        if not self.display_lists:
+            self.compile()
+        if frustum is None:
+            visible = self.display_lists
+        else:
+            mask = frustum.aabbs_visible(self.chunk_mins, self.chunk_maxs)
+            visible = [list_id for list_id, shown in zip(self.display_lists, mask) if shown]
+        self.visible_chunks = len(visible)
+        for list_id in visible:
+            glCallList(list_id)
+        gl_state.invalidate_color()
 
     def draw_partition_walls(self, x, z):
         glColor3f(0.3, 0.3, 0.3)
@@ -202,4 +210,4 @@ class World:
         glRotatef(90, 0, 1, 0)
         glScalef(0.05, 1.0, 0.8)
         draw_cube()
-        glPopMatrix()
\ No newline at end of file
+        glPopMatrix()
@@ -0,0 +1,6 @@
+import os
+import sys
+
+# The game runs from src/ with flat imports
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
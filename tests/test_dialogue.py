@@ -0,0 +1,80 @@
+import numpy as np
+import pygame
+import pytest
+import dialogue
+import render_state
+from audio_util import NullAudioPlayer
+from backends import FakeBackend
+from config import SAMPLE_RATE
+
+class RecordingPlayer(NullAudioPlayer):
+    def __init__(self):
+        super().__init__()
+        self.chunks = []
+
+    def add_data(self, data):
+        super().add_data(data)
+        self.chunks.append(bytes(data))
+
+@pytest.fixture
+def system(monkeypatch):
+    # No GL context in CI, so the constructor's texture setup is stubbed out
+    for name in ("glGenTextures", "glTexParameteri", "glTexImage2D"):
+        monkeypatch.setattr(dialogue, name, lambda *args: 1)
+    monkeypatch.setattr(render_state, "glBindTexture", lambda *args: None)
+    pygame.display.set_mode((1, 1))
+    backend = FakeBackend(latency=0, jitter=0, token_delay=0, realtime_factor=1000)
+    ui = dialogue.DialogueSystem(backend, pygame.display.get_surface(), audio_player=RecordingPlayer())
+    # Sentences are collected here instead of going to the TTS worker thread
+    ui.spoken = []
+    monkeypatch.setattr(ui, "speak", lambda text, generation=None: ui.spoken.append(text))
+    ui.conversation_history.reset("You are the HR manager.")
+    yield ui
+    ui.loop.call_soon_threadsafe(ui.loop.stop)
+    ui.executor.shutdown()
+
+def test_streamed_reply_is_spoken_in_sentences(system):
+    system.send_text_message("Tell me about the company.")
+    system.update()
+    reply = system.conversation_history.messages()[-1]
+    assert reply["role"] == "assistant"
+    assert system.npc_message == reply["content"]
+    assert len(system.spoken) > 1
+    assert all(len(part) >= dialogue.MIN_TTS_SENTENCE_CHARS for part in system.spoken[:-1])
+    assert " ".join(system.spoken) == reply["content"].strip()
+
+def test_reply_from_previous_conversation_is_dropped(system, monkeypatch):
+    stream_chat = system.backend.stream_chat
+
+    def interrupted(messages, model, **params):
+        for i, delta in enumerate(stream_chat(messages, model, **params)):
+            if i == 3:
+                system.conversation_history.reset("You are the CEO.")
+            yield delta
+
+    monkeypatch.setattr(system.backend, "stream_chat", interrupted)
+    system.send_text_message("Tell me about the company.")
+    system.update()
+    assert system.conversation_history.messages() == [{"role": "system", "content": "You are the CEO."}]
+    assert system.npc_message == ""
+    assert system.spoken == []
+
+def test_cancelled_speech_never_reaches_the_player(system):
+    generation = system.tts_generation
+    system.cancel_speech()
+    system.generate_tts("This line was interrupted.", generation)
+    assert system.audio_player.chunks == []
+    system.generate_tts("This one plays.", system.tts_generation)
+    expected = system.backend.synthesize("This one plays.", "echo", dialogue.TTS_MODEL)
+    assert b"".join(system.audio_player.chunks) == expected
+    assert system.tts_metrics["bytes"] == len(expected)
+    stats = system.get_tts_stats()
+    assert stats["samples"] == 1 and stats["last"]["bytes"] == len(expected)
+    assert stats["first_audio_p50_ms"] == stats["first_audio_p95_ms"] >= 0
+
+def test_silence_is_answered_without_transcribing(system):
+    system.process_audio_input(np.zeros(SAMPLE_RATE, dtype=np.int16), system.conversation_history.epoch)
+    system.update()
+    assert system.npc_message == dialogue.NOT_UNDERSTOOD_MESSAGE
+    assert system.spoken == [dialogue.NOT_UNDERSTOOD_MESSAGE]
+    assert system.backend.calls["transcribe"] == 0
@@ -0,0 +1,53 @@
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+from audio_util import encode_audio
+from backends import FakeBackend, FakeBackendError
+from config import SAMPLE_RATE
+from history import ConversationHistory
+
+def run_turn(backend, history, clip):
+    upload = encode_audio(clip, SAMPLE_RATE, "WAV")
+    history.append("user", backend.transcribe(upload, "whisper-1"), history.epoch)
+    reply = "".join(backend.stream_chat(history.messages(), "gpt-4")).strip()
+    history.append("assistant", reply, history.epoch)
+    audio = b"".join(backend.stream_speech(reply, "alloy", "tts-1", None))
+    return reply, audio
+
+def test_turn_through_fake_backend():
+    backend = FakeBackend(latency=0, jitter=0, token_delay=0, realtime_factor=1000, chunk_bytes=1000)
+    history = ConversationHistory()
+    history.reset("You are the HR manager.")
+    clip = (np.sin(np.arange(SAMPLE_RATE) / 10) * 3000).astype(np.int16)
+    reply, audio = run_turn(backend, history, clip)
+    assert reply.startswith("Thanks for asking about Tell me about the company")
+    assert [m["role"] for m in history.messages()] == ["system", "user", "assistant"]
+    assert len(audio) % 2 == 0 and audio == backend.synthesize(reply, "alloy", "tts-1")
+    chunks = list(backend.stream_speech(reply, "alloy", "tts-1", None))
+    assert all(len(chunk) <= backend.chunk_bytes for chunk in chunks)
+    assert backend.calls == {"transcribe": 1, "stream_chat": 1, "stream_speech": 2, "synthesize": 1}
+
+def test_failures_do_not_depend_on_thread_scheduling():
+    texts = [f"Line number {i}." for i in range(40)]
+
+    def outcomes(workers, order):
+        backend = FakeBackend(latency=0, jitter=0, failure_rate=0.5, seed=7)
+
+        def attempt(text):
+            try:
+                backend.synthesize(text, "alloy", "tts-1")
+                return text, True
+            except FakeBackendError:
+                return text, False
+
+        with ThreadPoolExecutor(workers) as pool:
+            return dict(pool.map(attempt, order))
+
+    first = outcomes(1, texts)
+    assert first == outcomes(8, texts[::-1])
+    assert 0 < sum(first.values()) < len(texts)
+
+def test_from_env():
+    backend = FakeBackend.from_env({"VBAI_FAKE_LATENCY": "0.8", "VBAI_FAKE_FAILURE_RATE": "0.1",
+                                    "VBAI_FAKE_CHUNK_BYTES": "9600", "VBAI_FAKE_SEED": "3"})
+    assert (backend.latency, backend.failure_rate, backend.chunk_bytes, backend.seed) == (0.8, 0.1, 9600, 3)
+    assert FakeBackend.from_env({}).jitter == FakeBackend().jitter